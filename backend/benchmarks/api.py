@@ -0,0 +1,90 @@
+"""End-to-end throughput and latency runs against the in-process ASGI app."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Iterator
+
+import httpx
+
+from benchmarks.harness import BenchmarkResult, summarize_timings
+from benchmarks.micro import make_properties
+from backend.main import app
+
+PayloadFactory = Callable[[int], dict]
+
+
+def _properties(count: int) -> list[dict]:
+    return [prop.dict() for prop in make_properties(count)]
+
+
+def scenarios(quick: bool) -> dict[str, tuple[str, PayloadFactory]]:
+    size = 10 if quick else 100
+    properties = _properties(size)
+    # Every request gets a distinct rate so the result cache never answers it.
+    return {
+        f"api/simulate/properties={size}": (
+            "/simulate",
+            lambda index: {
+                "properties": properties,
+                "years": 30,
+                "appreciation_rate": 0.03 + index * 1e-9,
+            },
+        ),
+        f"api/simulate/columnar/properties={size}": (
+            "/simulate/columnar",
+            lambda index: {
+                "properties": properties,
+                "years": 30,
+                "appreciation_rate": 0.03 + index * 1e-9,
+            },
+        ),
+        f"api/monte-carlo/properties={size}": (
+            "/monte-carlo",
+            lambda index: {
+                "properties": properties,
+                "years": 30,
+                "iterations": 500,
+                "summary_only": True,
+            },
+        ),
+    }
+
+
+async def _load(
+    path: str, payload: PayloadFactory, requests: int, concurrency: int
+) -> tuple[list[float], float]:
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def send(index: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, json=payload(index))
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        await send(-1)  # warm-up
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(send(index) for index in range(requests)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def run(
+    quick: bool = False, requests: int = 200, concurrency: int = 8
+) -> Iterator[BenchmarkResult]:
+    if quick:
+        requests = min(requests, 40)
+    for name, (path, payload) in scenarios(quick).items():
+        latencies, elapsed = asyncio.run(_load(path, payload, requests, concurrency))
+        yield summarize_timings(
+            f"{name}/concurrency={concurrency}",
+            latencies,
+            throughput_rps=requests / elapsed,
+        )
@@ -0,0 +1,107 @@
+"""Timing, memory and baseline comparison helpers for the benchmark suite."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    runs: int
+    min_s: float
+    median_s: float
+    p95_s: float
+    mean_s: float
+    peak_bytes: Optional[int] = None
+    throughput_rps: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize_timings(name: str, timings: list[float], **extra) -> BenchmarkResult:
+    return BenchmarkResult(
+        name=name,
+        runs=len(timings),
+        min_s=min(timings),
+        median_s=statistics.median(timings),
+        p95_s=percentile(timings, 0.95),
+        mean_s=statistics.fmean(timings),
+        **extra,
+    )
+
+
+def peak_memory(function: Callable[[], object]) -> int:
+    """Peak bytes allocated while ``function`` runs, as seen by tracemalloc."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(
+    name: str,
+    function: Callable[[], object],
+    setup: Optional[Callable[[], None]] = None,
+    repeat: int = 5,
+    warmup: int = 1,
+    track_memory: bool = True,
+) -> BenchmarkResult:
+    """Time ``function`` ``repeat`` times, calling ``setup`` untimed before each run."""
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        function()
+
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    peak = None
+    if track_memory:
+        # Measured in a separate pass: tracing allocations skews the timings.
+        if setup is not None:
+            setup()
+        peak = peak_memory(function)
+    return summarize_timings(name, timings, peak_bytes=peak)
+
+
+def compare(
+    current: dict[str, dict], baseline: dict[str, dict], threshold: float
+) -> list[str]:
+    """Describe every benchmark whose median time or peak memory regressed.
+
+    A regression is a ratio above ``1 + threshold`` against the baseline.
+    """
+    regressions = []
+    for name, result in current.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in ("median_s", "peak_bytes"):
+            if metric not in result or not reference.get(metric):
+                continue
+            ratio = result[metric] / reference[metric]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{name}: {metric} {reference[metric]:.6g} -> "
+                    f"{result[metric]:.6g} ({ratio:.2f}x)"
+                )
+    return regressions
@@ -0,0 +1,87 @@
+"""Micro-benchmarks for the finance engine across portfolio shapes."""
+
+from __future__ import annotations
+
+import random
+from typing import Iterator
+
+from benchmarks.harness import BenchmarkResult, benchmark
+from finance.simulate import (
+    memoized_property_cashflow,
+    property_cashflow,
+    run_monte_carlo,
+    simulate_portfolio,
+)
+from schemas import MonteCarloRequest, PortfolioSimulationRequest, Property
+
+PORTFOLIO_SIZES = (1, 10, 100, 1000)
+HORIZONS = (1, 10, 40)
+ITERATIONS = (100, 1000)
+
+
+def make_properties(count: int, seed: int = 0) -> list[Property]:
+    """Deterministic synthetic portfolio with realistic price and rent ranges."""
+    rng = random.Random(seed)
+    properties = []
+    for index in range(count):
+        price = rng.uniform(150_000, 900_000)
+        properties.append(
+            Property(
+                name=f"Property {index}",
+                purchase_price=price,
+                down_payment=price * rng.choice((0.1, 0.2, 0.25)),
+                mortgage_rate=rng.choice((0.035, 0.045, 0.06)),
+                mortgage_years=rng.choice((15, 30)),
+                annual_rent=price * rng.uniform(0.06, 0.1),
+                annual_expenses=price * rng.uniform(0.01, 0.03),
+            )
+        )
+    return properties
+
+
+def run(quick: bool = False, repeat: int = 5) -> Iterator[BenchmarkResult]:
+    sizes = PORTFOLIO_SIZES[:3] if quick else PORTFOLIO_SIZES
+    horizons = HORIZONS[1:2] if quick else HORIZONS
+    iterations = ITERATIONS[:1] if quick else ITERATIONS
+
+    prop = make_properties(1)[0]
+    for years in horizons:
+        yield benchmark(
+            f"property_cashflow/years={years}",
+            lambda years=years: property_cashflow(
+                purchase_price=prop.purchase_price,
+                down_payment=prop.down_payment,
+                mortgage_rate=prop.mortgage_rate,
+                mortgage_years=prop.mortgage_years,
+                annual_rent=prop.annual_rent,
+                annual_expenses=prop.annual_expenses,
+                appreciation_rate=0.03,
+                rent_growth=0.02,
+                years=years,
+            ),
+            repeat=repeat * 20,
+        )
+
+    for size in sizes:
+        properties = make_properties(size)
+        for years in horizons:
+            request = PortfolioSimulationRequest(properties=properties, years=years)
+            # Cold runs: clear the per-property memo so every call recomputes.
+            yield benchmark(
+                f"simulate_portfolio/properties={size}/years={years}",
+                lambda request=request: simulate_portfolio(request),
+                setup=memoized_property_cashflow.cache_clear,
+                repeat=repeat,
+            )
+
+        for count in iterations:
+            for years in horizons:
+                request = MonteCarloRequest(
+                    properties=properties, years=years, iterations=count, seed=0
+                )
+                yield benchmark(
+                    f"run_monte_carlo/properties={size}/years={years}"
+                    f"/iterations={count}",
+                    lambda request=request: run_monte_carlo(request),
+                    repeat=repeat,
+                )
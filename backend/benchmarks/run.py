@@ -0,0 +1,105 @@
+"""Run the benchmark suite and compare the results against a stored baseline.
+
+Usage (from the repository root)::
+
+    python backend/benchmarks/run.py --suite all --baseline backend/benchmarks/baseline.json
+
+Exits with status 1 when any benchmark is slower, or uses more memory, than
+the baseline by more than ``--threshold``.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import platform
+import sys
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+# The finance modules import ``models``/``schemas`` as top-level modules.
+sys.path[:0] = [str(BACKEND_DIR), str(BACKEND_DIR.parent)]
+
+import numpy as np  # noqa: E402
+
+from benchmarks import api, micro  # noqa: E402
+from benchmarks.harness import compare  # noqa: E402
+
+DEFAULT_OUTPUT = BACKEND_DIR / "benchmarks" / "results" / "latest.json"
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", choices=("micro", "api", "all"), default="all")
+    parser.add_argument("--quick", action="store_true", help="smaller matrix")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown ratio before failing (0.2 = 20%%)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write these results to --baseline instead of comparing",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> int:
+    args = parse_args(argv)
+    results = {}
+    suites = []
+    if args.suite in ("micro", "all"):
+        suites.append(micro.run(quick=args.quick, repeat=args.repeat))
+    if args.suite in ("api", "all"):
+        suites.append(
+            api.run(
+                quick=args.quick,
+                requests=args.requests,
+                concurrency=args.concurrency,
+            )
+        )
+    for suite in suites:
+        for result in suite:
+            results[result.name] = result.to_dict()
+            print(
+                f"{result.name:<70} median {result.median_s * 1000:9.3f} ms"
+                f"  p95 {result.p95_s * 1000:9.3f} ms"
+            )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.output}")
+
+    if args.baseline is None:
+        return 0
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Updated baseline {args.baseline}")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,166 @@
+"""Content-addressed cache for encoded simulation responses."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+
+# Seconds between sweeps of expired and excess rows from the disk tier.
+DISK_PRUNE_INTERVAL = 60
+
+
+def source_fingerprint() -> str:
+    """Hash of the service's Python sources, so a deploy invalidates old results."""
+    root = Path(__file__).resolve().parent
+    digest = hashlib.sha256()
+    for path in sorted([*root.glob("*.py"), *root.glob("finance/*.py")]):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Set RESULT_CACHE_VERSION (e.g. to the deployed commit) to skip hashing sources.
+CODE_VERSION = os.environ.get("RESULT_CACHE_VERSION") or source_fingerprint()
+
+
+def request_key(
+    namespace: str, request: BaseModel, exclude: Optional[set[str]] = None
+) -> str:
+    """Hash the validated request, independent of field order and formatting."""
+    payload = json.dumps(
+        request.dict(exclude=exclude), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(
+        f"{CODE_VERSION}:{namespace}:{payload}".encode()
+    ).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU with per-entry TTL and an optional SQLite tier."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 600,
+        disk_path: Optional[str] = None,
+        max_disk_entries: int = 10_000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        self._disk: Optional[sqlite3.Connection] = None
+        # Disk I/O has its own lock so memory hits never wait on SQLite.
+        self._disk_lock = threading.Lock()
+        self._next_prune = 0.0
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)"
+            )
+            self._disk.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+        row = None
+        if self._disk is not None:
+            with self._disk_lock:
+                row = self._disk.execute(
+                    "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+
+        with self._lock:
+            if row is not None and row[1] > now:
+                self._store(key, row[0], row[1])
+                self._counters["disk_hits"] += 1
+                return row[0]
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self._disk is None:
+            return
+        with self._disk_lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            now = time.time()
+            if now >= self._next_prune:
+                self._prune(now)
+                self._next_prune = now + DISK_PRUNE_INTERVAL
+            self._disk.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM results")
+                self._disk.commit()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
+
+    def _prune(self, now: float) -> None:
+        """Drop expired rows, then the soonest-expiring rows beyond the limit."""
+        self._disk.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        (count,) = self._disk.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_disk_entries:
+            self._disk.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY expires_at LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+    def _store(self, key: str, value: bytes, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.environ.get("RESULT_CACHE_TTL", "600")),
+    disk_path=os.environ.get("RESULT_CACHE_PATH") or None,
+)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Iterator, List
+
+import numpy as np
+
+from models import MortgageScheduleEntry
+
+# Balances below this are treated as paid off, matching the monthly schedule.
+BALANCE_EPSILON = 1e-5
+
+
+def mortgage_payment(principal: float, annual_rate: float, years: int) -> float:
+    if annual_rate == 0:
+        return principal / (years * 12)
+    monthly_rate = annual_rate / 12
+    n_payments = years * 12
+    payment = principal * (monthly_rate * (1 + monthly_rate) ** n_payments) / (
+        (1 + monthly_rate) ** n_payments - 1
+    )
+    return payment
+
+
+def remaining_balance(
+    principal: float, annual_rate: float, years: int, month: int
+) -> float:
+    """Closed-form loan balance after ``month`` payments."""
+    n_payments = years * 12
+    if month >= n_payments:
+        return 0.0
+    payment = mortgage_payment(principal, annual_rate, years)
+    if annual_rate == 0:
+        balance = principal - payment * month
+    else:
+        monthly_rate = annual_rate / 12
+        growth = (1 + monthly_rate) ** month
+        balance = principal * growth - payment * (growth - 1) / monthly_rate
+    return balance if balance >= BALANCE_EPSILON else 0.0
+
+
+def mortgage_payments(principal, annual_rate, years) -> np.ndarray:
+    """Vectorized ``mortgage_payment`` over broadcastable loan arrays."""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 12
+    n_payments = np.asarray(years, dtype=float) * 12
+    growth = (1 + monthly_rate) ** n_payments
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortizing = principal * monthly_rate * growth / (growth - 1)
+    return np.where(monthly_rate == 0, principal / n_payments, amortizing)
+
+
+def remaining_balances(principal, annual_rate, years, months) -> np.ndarray:
+    """Vectorized ``remaining_balance`` over broadcastable loan and month arrays."""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 12
+    n_payments = np.asarray(years, dtype=float) * 12
+    months = np.minimum(np.asarray(months, dtype=float), n_payments)
+
+    payment = mortgage_payments(principal, annual_rate, years)
+    growth = (1 + monthly_rate) ** months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortizing = principal * growth - payment * (growth - 1) / monthly_rate
+    balance = np.where(monthly_rate == 0, principal - payment * months, amortizing)
+    return np.where(
+        (balance < BALANCE_EPSILON) | (months >= n_payments), 0.0, balance
+    )
+
+
+def iter_amortization_schedule(
+    principal: float, annual_rate: float, years: int
+) -> Iterator[MortgageScheduleEntry]:
+    balance = principal
+    payment = mortgage_payment(principal, annual_rate, years)
+    monthly_rate = annual_rate / 12
+
+    for month in range(1, years * 12 + 1):
+        interest = balance * monthly_rate
+        principal_paid = payment - interest
+        balance = max(balance - principal_paid, 0)
+        if balance < BALANCE_EPSILON:
+            balance = 0
+        yield MortgageScheduleEntry(
+            month=month,
+            payment=payment,
+            principal=principal_paid,
+            interest=interest,
+            balance=balance,
+        )
+        if balance == 0:
+            break
+
+
+def amortization_schedule(
+    principal: float, annual_rate: float, years: int
+) -> List[MortgageScheduleEntry]:
+    return list(iter_amortization_schedule(principal, annual_rate, years))
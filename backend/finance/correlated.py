@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+from finance.sampling import batch_ids, shard_seeds
+from finance.statistics import (
+    SUMMARY_METRICS,
+    StreamingSummary,
+    metric_intervals,
+    precision_reached,
+    summarize_metrics,
+)
+from finance.vectorized import PropertyArrays, simulate_rate_paths
+from schemas import (
+    DEFAULT_MARKET,
+    CorrelatedMonteCarloRequest,
+    CorrelatedMonteCarloResponse,
+    check_path_cells,
+)
+
+# Shock paths hold several (iterations, properties, years) arrays at once, so
+# they are evaluated in smaller chunks than the single-rate engine.
+MAX_PATH_CELLS = 1_000_000
+# Upper bound on iterations per chunk, which is also the early-stopping step.
+MAX_PATH_ITERATIONS = 1024
+# Eigenvalues below this are treated as rounding noise in a valid matrix.
+EIGENVALUE_TOLERANCE = 1e-10
+
+
+@dataclass
+class ShockModel:
+    """Factor model for correlated appreciation and rent growth shocks.
+
+    Each shock is ``sqrt(w) * market factor + sqrt(1 - w) * idiosyncratic``
+    with ``w`` the within-market correlation. Market factors are correlated
+    through ``factor_loading``, a factorization of
+    ``kron([[1, rho], [rho, 1]], R)``, where ``R`` holds the cross-market
+    correlations divided by ``w``. Drawing a chunk costs one batched matrix
+    product over markets rather than one over every pair of properties.
+    """
+
+    markets: list[str]
+    market_index: np.ndarray
+    market_weight: float
+    factor_loading: np.ndarray
+    idiosyncratic_loading: np.ndarray
+    persistence: float
+
+    @classmethod
+    def from_request(cls, request: CorrelatedMonteCarloRequest) -> "ShockModel":
+        """Build the model, raising ``ValueError`` for inconsistent correlations."""
+        names = [prop.market or DEFAULT_MARKET for prop in request.properties]
+        markets = sorted(set(names))
+        position = {market: index for index, market in enumerate(markets)}
+        for market, row in request.market_correlations.items():
+            for other, value in row.items():
+                if market not in position or other not in position:
+                    raise ValueError(f"unknown market pair: {market}, {other}")
+                if not -1 <= value <= 1:
+                    raise ValueError(f"correlation out of range: {market}, {other}")
+
+        within = request.market_correlation
+        factor_correlation = np.eye(len(markets))
+        for first, second in np.transpose(np.triu_indices(len(markets), 1)):
+            pair = (markets[first], markets[second])
+            value = request.market_correlations.get(pair[0], {}).get(
+                pair[1],
+                request.market_correlations.get(pair[1], {}).get(
+                    pair[0], request.cross_market_correlation
+                ),
+            )
+            if abs(value) > within:
+                raise ValueError(
+                    "cross-market correlation cannot exceed market_correlation: "
+                    f"{pair[0]}, {pair[1]}"
+                )
+            ratio = value / within if within else 0.0
+            factor_correlation[first, second] = ratio
+            factor_correlation[second, first] = ratio
+
+        rho = request.rent_appreciation_correlation
+        pair_correlation = np.array([[1.0, rho], [rho, 1.0]])
+        return cls(
+            markets=markets,
+            market_index=np.array([position[name] for name in names], dtype=int),
+            market_weight=within,
+            factor_loading=_psd_factor(np.kron(pair_correlation, factor_correlation)),
+            idiosyncratic_loading=_psd_factor(pair_correlation),
+            persistence=request.persistence,
+        )
+
+    def draw(
+        self, rng: np.random.Generator, iterations: int, years: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Unit-variance shocks shaped (iterations, properties, years)."""
+        market_count = len(self.markets)
+        factors = (
+            rng.standard_normal((iterations, years, 2 * market_count))
+            @ self.factor_loading.T
+        )
+        own = (
+            rng.standard_normal((iterations, years, len(self.market_index), 2))
+            @ self.idiosyncratic_loading.T
+        )
+        market = np.sqrt(self.market_weight)
+        idiosyncratic = np.sqrt(1 - self.market_weight)
+        shocks = []
+        for variable in range(2):
+            columns = slice(variable * market_count, (variable + 1) * market_count)
+            common = factors[:, :, columns]
+            shock = (
+                market * common[:, :, self.market_index]
+                + idiosyncratic * own[..., variable]
+            )
+            shocks.append(self._persist(shock).transpose(0, 2, 1))
+        return shocks[0], shocks[1]
+
+    def _persist(self, shocks: np.ndarray) -> np.ndarray:
+        """Turn independent yearly shocks into a stationary AR(1) along years."""
+        if self.persistence == 0:
+            return shocks
+        innovation = np.sqrt(1 - self.persistence**2)
+        for year in range(1, shocks.shape[1]):
+            shocks[:, year] = (
+                self.persistence * shocks[:, year - 1] + innovation * shocks[:, year]
+            )
+        return shocks
+
+
+def _psd_factor(matrix: np.ndarray) -> np.ndarray:
+    """Square-root factor of a correlation matrix that may be singular."""
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    if eigenvalues.min() < -EIGENVALUE_TOLERANCE:
+        raise ValueError("market correlations are not a valid correlation matrix")
+    return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+
+def path_chunk_sizes(request: CorrelatedMonteCarloRequest) -> list[int]:
+    """Iterations per chunk; fixed by the request so a seed maps to one result."""
+    cells = max(len(request.properties) * request.years, 1)
+    step = min(max(MAX_PATH_CELLS // cells, 2), MAX_PATH_ITERATIONS)
+    step -= step % 2  # keep antithetic pairs within a chunk
+    full, remainder = divmod(request.iterations, step)
+    return [step] * full + ([remainder] if remainder else [])
+
+
+def iter_correlated_chunks(
+    request: CorrelatedMonteCarloRequest, model: ShockModel
+) -> Iterator[tuple[np.ndarray, dict[str, np.ndarray], np.ndarray]]:
+    """Yield (batch ids, portfolio totals, per-market totals) for each chunk.
+
+    Per-market totals are shaped (iterations, markets, metrics) in
+    ``SUMMARY_METRICS`` order.
+    """
+    arrays = PropertyArrays.from_properties(request.properties)
+    membership = np.zeros((len(arrays), len(model.markets)))
+    membership[np.arange(len(arrays)), model.market_index] = 1
+
+    sizes = path_chunk_sizes(request)
+    offset = 0
+    for seed, size in zip(shard_seeds(request.seed, len(sizes)), sizes):
+        rng = np.random.default_rng(seed)
+        if request.sampling == "antithetic":
+            half = model.draw(rng, (size + 1) // 2, request.years)
+            # Interleave each path with its mirror image.
+            appreciation_shocks, rent_shocks = (
+                np.stack([shock, -shock], axis=1).reshape(-1, *shock.shape[1:])
+                for shock in half
+            )
+            appreciation_shocks = appreciation_shocks[:size]
+            rent_shocks = rent_shocks[:size]
+        else:
+            appreciation_shocks, rent_shocks = model.draw(rng, size, request.years)
+
+        paths = simulate_rate_paths(
+            arrays,
+            request.appreciation_rate
+            + request.appreciation_volatility * appreciation_shocks,
+            request.rent_growth_rate + request.rent_growth_volatility * rent_shocks,
+        )
+        by_property = {
+            "cashflow": paths.cashflows.sum(axis=2),
+            "equity": paths.equity[:, :, -1],
+        }
+        by_market = np.stack(
+            [by_property[metric] @ membership for metric in SUMMARY_METRICS], axis=2
+        )
+        totals = {metric: values.sum(axis=1) for metric, values in by_property.items()}
+        yield batch_ids(request.sampling, offset, size), totals, by_market
+        offset += size
+
+
+def run_correlated_monte_carlo(
+    request: CorrelatedMonteCarloRequest,
+    progress: Optional[Callable[[int], None]] = None,
+) -> CorrelatedMonteCarloResponse:
+    """Simulate per-year, per-property shock paths and summarize by market.
+
+    Raises ``ValueError`` for an empty portfolio or when the requested
+    correlations are inconsistent.
+    """
+    if not request.properties:
+        raise ValueError("correlated simulation needs at least one property")
+    check_path_cells(request.iterations, len(request.properties), request.years)
+    model = ShockModel.from_request(request)
+    summaries = {metric: StreamingSummary() for metric in SUMMARY_METRICS}
+    markets = {
+        market: {metric: StreamingSummary() for metric in SUMMARY_METRICS}
+        for market in model.markets
+    }
+    completed = 0
+    stopping = request.target_precision is not None
+
+    for batches, totals, by_market in iter_correlated_chunks(request, model):
+        for metric, summary in summaries.items():
+            summary.update(totals[metric], batches)
+        for index, market in enumerate(model.markets):
+            for position, metric in enumerate(SUMMARY_METRICS):
+                markets[market][metric].update(by_market[:, index, position])
+        completed += len(batches)
+        if progress is not None:
+            progress(completed)
+        if stopping and precision_reached(
+            summaries, request.target_precision, request.confidence_level
+        ):
+            break
+
+    summary, histograms = summarize_metrics(summaries)
+    converged = None
+    if stopping:
+        converged = precision_reached(
+            summaries, request.target_precision, request.confidence_level
+        )
+    return CorrelatedMonteCarloResponse(
+        iterations=completed,
+        summary=summary,
+        histograms=histograms,
+        intervals=metric_intervals(
+            summaries, request.confidence_level, request.sampling == "random"
+        ),
+        converged=converged,
+        markets={
+            market: {
+                metric: summary.to_dict() for metric, summary in metrics.items()
+            }
+            for market, metrics in markets.items()
+        },
+    )
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import numpy as np
+
+from finance.vectorized import PropertyArrays, portfolio_totals
+from schemas import SensitivityGridRequest, check_grid_cells
+
+
+def simulate_grid(request: SensitivityGridRequest) -> dict:
+    """Evaluate portfolio totals over appreciation x rent growth x years at once.
+
+    Raises ``ValueError`` when the grid is too large for the portfolio.
+    """
+    check_grid_cells(
+        len(request.appreciation_rates) * len(request.rent_growth_rates),
+        len(request.properties),
+        max(request.years),
+    )
+    appreciation = np.asarray(request.appreciation_rates, dtype=float)
+    rent_growth = np.asarray(request.rent_growth_rates, dtype=float)
+    # Each (appreciation, rent growth) cell becomes one row of the batch.
+    appreciation_cells, rent_growth_cells = np.meshgrid(
+        appreciation, rent_growth, indexing="ij"
+    )
+    # Earlier years never depend on the horizon, so one run to the longest
+    # horizon yields every requested one.
+    totals = portfolio_totals(
+        PropertyArrays.from_properties(request.properties),
+        max(request.years),
+        appreciation_cells.ravel(),
+        rent_growth_cells.ravel(),
+        horizons=request.years,
+    )
+    shape = (len(appreciation), len(rent_growth), len(request.years))
+    return {
+        "appreciation_rates": request.appreciation_rates,
+        "rent_growth_rates": request.rent_growth_rates,
+        "years": request.years,
+        "totals": {
+            metric: values.reshape(shape).tolist() for metric, values in totals.items()
+        },
+    }
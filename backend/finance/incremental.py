@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import threading
+import uuid
+
+from finance.simulate import property_breakdown, property_metrics, yearly_snapshots
+from models import PropertyMetrics
+from schemas import (
+    PortfolioDeltaRequest,
+    PortfolioDeltaResponse,
+    PortfolioSimulationRequest,
+    Property,
+)
+
+MAX_WORKING_PORTFOLIOS = 256
+
+
+class UnknownPortfolioKey(Exception):
+    """No working portfolio is stored under the given ``base_key``."""
+
+
+@dataclass
+class PortfolioState:
+    """Running totals for a portfolio that can absorb single-property edits."""
+
+    years: int
+    appreciation_rate: float
+    rent_growth_rate: float
+    properties: dict[str, PropertyMetrics] = field(default_factory=dict)
+    totals: dict[str, float] = field(
+        default_factory=lambda: {"cashflow": 0.0, "equity": 0.0, "investment": 0.0}
+    )
+    yearly_cashflows: list[float] = field(default_factory=list)
+
+    @classmethod
+    def from_request(cls, request: PortfolioSimulationRequest) -> "PortfolioState":
+        state = cls(
+            years=request.years,
+            appreciation_rate=request.appreciation_rate,
+            rent_growth_rate=request.rent_growth_rate,
+            yearly_cashflows=[0.0] * request.years,
+        )
+        for prop in request.properties:
+            if prop.name in state.properties:
+                raise ValueError(f"duplicate property name: {prop.name}")
+            state.add(prop)
+        return state
+
+    def add(self, prop: Property) -> PropertyMetrics:
+        metrics = property_metrics(
+            prop, self.appreciation_rate, self.rent_growth_rate, self.years
+        )
+        self.properties[prop.name] = metrics
+        self._apply(metrics, 1)
+        return metrics
+
+    def remove(self, name: str) -> None:
+        self._apply(self.properties.pop(name), -1)
+
+    def _apply(self, metrics: PropertyMetrics, sign: int) -> None:
+        self.totals["cashflow"] += sign * metrics.total_cashflow
+        self.totals["equity"] += sign * metrics.equity
+        self.totals["investment"] += sign * metrics.total_investment
+        for year, cashflow in enumerate(metrics.yearly_cashflows):
+            self.yearly_cashflows[year] += sign * cashflow
+
+
+_states: OrderedDict[str, PortfolioState] = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def _store_state(state: PortfolioState) -> str:
+    key = uuid.uuid4().hex
+    _states[key] = state
+    while len(_states) > MAX_WORKING_PORTFOLIOS:
+        _states.popitem(last=False)
+    return key
+
+
+def apply_portfolio_delta(request: PortfolioDeltaRequest) -> PortfolioDeltaResponse:
+    """Apply property edits to a working portfolio, recomputing only what changed.
+
+    A full ``base`` portfolio starts a new working copy; ``base_key`` edits an
+    existing one in place and keeps its key. Raises ``UnknownPortfolioKey`` for
+    an unknown key and ``ValueError`` for edits that do not match the portfolio.
+    """
+    if request.base is not None:
+        state = PortfolioState.from_request(request.base)
+        with _states_lock:
+            key = _store_state(state)
+    else:
+        key = request.base_key
+        with _states_lock:
+            if key not in _states:
+                raise UnknownPortfolioKey(key)
+            state = _states[key]
+            _states.move_to_end(key)
+
+    with _states_lock:
+        _check_delta(state, request)
+        for name in request.removed:
+            state.remove(name)
+        recomputed = []
+        for prop in [*request.changed, *request.added]:
+            if prop.name in state.properties:
+                state.remove(prop.name)
+            recomputed.append(property_breakdown(prop.name, state.add(prop)))
+
+        return PortfolioDeltaResponse(
+            key=key,
+            properties=recomputed,
+            removed=request.removed,
+            totals=dict(state.totals),
+            yearly=yearly_snapshots(state.yearly_cashflows),
+        )
+
+
+def _check_delta(state: PortfolioState, request: PortfolioDeltaRequest) -> None:
+    """Validate every edit before any running total is touched."""
+    edited = {
+        "removed": request.removed,
+        "changed": [prop.name for prop in request.changed],
+        "added": [prop.name for prop in request.added],
+    }
+    for edit, names in edited.items():
+        if len(set(names)) < len(names):
+            raise ValueError(f"duplicate property name in {edit}")
+    removed = set(request.removed)
+    for name in removed:
+        if name not in state.properties:
+            raise ValueError(f"unknown property: {name}")
+    for prop in request.changed:
+        if prop.name not in state.properties or prop.name in removed:
+            raise ValueError(f"unknown property: {prop.name}")
+    for prop in request.added:
+        if prop.name in state.properties and prop.name not in removed:
+            raise ValueError(f"property already exists: {prop.name}")
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+import multiprocessing
+import os
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+from finance.sampling import (
+    SHARD_SIZE,
+    batch_ids,
+    draw_rates,
+    shard_seeds,
+    shard_sizes,
+)
+from finance.statistics import (
+    SUMMARY_METRICS,
+    StreamingSummary,
+    metric_intervals,
+    precision_reached,
+    summarize_metrics,
+)
+from finance.vectorized import PropertyArrays, portfolio_totals
+from schemas import (
+    MonteCarloRequest,
+    MonteCarloSummaryResponse,
+    ShardedMonteCarloRequest,
+)
+
+
+
+def _available_cpus() -> int:
+    # Affinity follows container CPU limits set by cpusets; cpu_count does not.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Size of the shared shard pool, and the cap on a request's ``workers``.
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "0")) or _available_cpus()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+@dataclass
+class ShardTask:
+    arrays: PropertyArrays
+    request: MonteCarloRequest
+    seed: np.random.SeedSequence
+    size: int
+    offset: int
+
+
+def _run_shard(task: ShardTask) -> dict[str, StreamingSummary]:
+    rng = np.random.default_rng(task.seed)
+    appreciation, rent_growth = draw_rates(task.request, rng, task.size)
+    totals = portfolio_totals(
+        task.arrays, task.request.years, appreciation, rent_growth
+    )
+    batches = batch_ids(task.request.sampling, task.offset, task.size)
+    summaries = {metric: StreamingSummary() for metric in SUMMARY_METRICS}
+    for metric, summary in summaries.items():
+        summary.update(totals[metric], batches)
+    return summaries
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver avoids forking the threaded uvicorn worker itself.
+            _pool = ProcessPoolExecutor(
+                max_workers=SHARD_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died so the next caller starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _map_bounded(
+    tasks: list[ShardTask],
+    workers: int,
+    on_result: Callable[[ShardTask, dict[str, StreamingSummary]], bool],
+) -> None:
+    """Run shards on the shared pool with at most ``workers`` in flight.
+
+    Results reach ``on_result`` in shard order; returning True stops the run.
+    If a worker dies (for example, killed for memory), the pool is replaced
+    and the uncollected shards are resubmitted once before giving up.
+    """
+    pool = _process_pool()
+    pending = deque(tasks)
+    in_flight: deque[tuple[ShardTask, Future]] = deque()
+    retried = False
+
+    try:
+        while pending or in_flight:
+            try:
+                if pending and len(in_flight) < workers:
+                    task = pending[0]
+                    in_flight.append((task, pool.submit(_run_shard, task)))
+                    pending.popleft()
+                    continue
+                task, future = in_flight[0]
+                result = future.result()
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                if retried:
+                    raise
+                retried = True
+                pool = _process_pool()
+                # Shards are seeded, so a resubmitted shard gives the same result.
+                pending.extendleft(reversed([task for task, _ in in_flight]))
+                in_flight.clear()
+                continue
+            in_flight.popleft()
+            if on_result(task, result):
+                return
+    finally:
+        # Drop queued shards if a caller aborts or the run stops part-way.
+        for _, future in in_flight:
+            future.cancel()
+
+
+def run_monte_carlo_sharded(
+    request: ShardedMonteCarloRequest,
+    progress: Optional[Callable[[int], None]] = None,
+) -> MonteCarloSummaryResponse:
+    arrays = PropertyArrays.from_properties(request.properties)
+    # Properties travel to the workers as arrays; drop the model list.
+    base_request = request.copy(update={"properties": []})
+    sizes = shard_sizes(request.iterations)
+    tasks = [
+        ShardTask(
+            arrays=arrays,
+            request=base_request,
+            seed=seed,
+            size=size,
+            offset=index * SHARD_SIZE,
+        )
+        for index, (seed, size) in enumerate(
+            zip(shard_seeds(request.seed, len(sizes)), sizes)
+        )
+    ]
+
+    # Merge in shard order so the summary never depends on scheduling.
+    merged = {metric: StreamingSummary() for metric in SUMMARY_METRICS}
+    completed = 0
+    shards = 0
+
+    def on_result(task: ShardTask, result: dict[str, StreamingSummary]) -> bool:
+        nonlocal completed, shards
+        for metric, summary in merged.items():
+            summary.merge(result[metric])
+        completed += task.size
+        shards += 1
+        if progress is not None:
+            progress(completed)
+        return request.target_precision is not None and precision_reached(
+            merged, request.target_precision, request.confidence_level
+        )
+
+    workers = min(request.workers or SHARD_WORKERS, SHARD_WORKERS, len(tasks))
+    if workers == 1:
+        for task in tasks:
+            if on_result(task, _run_shard(task)):
+                break
+    else:
+        _map_bounded(tasks, workers, on_result)
+
+    summary, histograms = summarize_metrics(merged)
+    converged = None
+    if request.target_precision is not None:
+        converged = precision_reached(
+            merged, request.target_precision, request.confidence_level
+        )
+    return MonteCarloSummaryResponse(
+        iterations=completed,
+        shards=shards,
+        seed=request.seed,
+        summary=summary,
+        histograms=histograms,
+        intervals=metric_intervals(
+            merged, request.confidence_level, request.sampling == "random"
+        ),
+        converged=converged,
+    )
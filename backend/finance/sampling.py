@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from schemas import MonteCarloRequest
+
+# Iterations are always drawn in fixed-size shards so a seed maps to the same
+# samples however many workers end up evaluating them.
+SHARD_SIZE = 10_000
+
+# Stratified designs are drawn in independently randomized batches. Each batch
+# is an unbiased estimate of the mean on its own, so the spread of batch means
+# gives a valid standard error even though draws within a batch are not
+# independent.
+DESIGN_BATCH_SIZE = 128
+BATCH_SIZES = {
+    "random": 1,
+    "antithetic": 2,
+    "latin_hypercube": DESIGN_BATCH_SIZE,
+    "sobol": DESIGN_BATCH_SIZE,
+}
+
+SOBOL_BITS = 32
+
+# Acklam's rational approximation to the inverse normal CDF (|error| < 1.2e-9).
+_ACKLAM_A = (
+    -3.969683028665376e01, 2.209460984245205e02, -2.759285104469687e02,
+    1.383577518672690e02, -3.066479806614716e01, 2.506628277459239e00,
+)
+_ACKLAM_B = (
+    -5.447609879822406e01, 1.615858368580409e02, -1.556989798598866e02,
+    6.680131188771972e01, -1.328068155288572e01, 1.0,
+)
+_ACKLAM_C = (
+    -7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e00,
+    -2.549732539343734e00, 4.374664141464968e00, 2.938163982698783e00,
+)
+_ACKLAM_D = (
+    7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e00,
+    3.754408661907416e00, 1.0,
+)
+_ACKLAM_LOW = 0.02425
+
+
+def shard_sizes(iterations: int) -> list[int]:
+    full, remainder = divmod(iterations, SHARD_SIZE)
+    return [SHARD_SIZE] * full + ([remainder] if remainder else [])
+
+
+def shard_seeds(seed: Optional[int], count: int) -> list[np.random.SeedSequence]:
+    return np.random.SeedSequence(seed).spawn(count)
+
+
+def batch_ids(sampling: str, offset: int, size: int) -> np.ndarray:
+    """Label each draw of a shard starting at ``offset`` with its batch."""
+    return offset + np.arange(size) // BATCH_SIZES[sampling]
+
+
+def draw_rates(
+    request: MonteCarloRequest, rng: np.random.Generator, size: int
+) -> tuple[np.ndarray, np.ndarray]:
+    if request.sampling == "random":
+        appreciation = rng.normal(
+            request.appreciation_rate, request.appreciation_volatility, size
+        )
+        rent_growth = rng.normal(
+            request.rent_growth_rate, request.rent_growth_volatility, size
+        )
+        return appreciation, rent_growth
+
+    normals = standard_normals(request.sampling, rng, size)
+    appreciation = (
+        request.appreciation_rate + request.appreciation_volatility * normals[:, 0]
+    )
+    rent_growth = (
+        request.rent_growth_rate + request.rent_growth_volatility * normals[:, 1]
+    )
+    return appreciation, rent_growth
+
+
+def standard_normals(
+    sampling: str, rng: np.random.Generator, size: int
+) -> np.ndarray:
+    """Draw ``size`` two-dimensional standard normal points with ``sampling``."""
+    if sampling == "antithetic":
+        half = rng.standard_normal(((size + 1) // 2, 2))
+        pairs = np.empty((2 * len(half), 2))
+        pairs[0::2] = half
+        pairs[1::2] = -half
+        return pairs[:size]
+
+    design = latin_hypercube if sampling == "latin_hypercube" else scrambled_sobol
+    uniforms = np.empty((size, 2))
+    for start in range(0, size, DESIGN_BATCH_SIZE):
+        count = min(DESIGN_BATCH_SIZE, size - start)
+        uniforms[start : start + count] = design(rng, count)
+    return inverse_normal_cdf(uniforms)
+
+
+def latin_hypercube(rng: np.random.Generator, size: int) -> np.ndarray:
+    """One uniform point in every 1/size slice of each dimension."""
+    strata = np.argsort(rng.random((size, 2)), axis=0)
+    return (strata + rng.random((size, 2))) / size
+
+
+def _sobol_directions() -> np.ndarray:
+    """Direction numbers for the first two Sobol dimensions, high bit first."""
+    directions = np.zeros((2, SOBOL_BITS), dtype=np.uint64)
+    m = 1
+    for bit in range(SOBOL_BITS):
+        shift = SOBOL_BITS - 1 - bit
+        directions[0, bit] = 1 << shift
+        directions[1, bit] = m << shift
+        # Primitive polynomial x + 1: m_k = 2 m_{k-1} xor m_{k-1}.
+        m = (m << 1) ^ m
+    return directions
+
+
+_SOBOL_DIRECTIONS = _sobol_directions()
+_BIT_VALUES = np.uint64(1) << np.arange(SOBOL_BITS - 1, -1, -1, dtype=np.uint64)
+
+
+def scrambled_sobol(rng: np.random.Generator, size: int) -> np.ndarray:
+    """First ``size`` points of a randomly scrambled two-dimensional Sobol net.
+
+    Uses a linear matrix scramble plus a digital shift, so every point is
+    uniform on the unit square while the net keeps its stratification.
+    """
+    scrambled = np.empty_like(_SOBOL_DIRECTIONS)
+    for dim, directions in enumerate(_SOBOL_DIRECTIONS):
+        bits = (directions[None, :] & _BIT_VALUES[:, None]) != 0
+        matrix = np.tril(rng.integers(0, 2, (SOBOL_BITS, SOBOL_BITS)), -1)
+        np.fill_diagonal(matrix, 1)
+        scrambled_bits = (matrix @ bits.astype(np.int64)) % 2
+        scrambled[dim] = _BIT_VALUES @ scrambled_bits.astype(np.uint64)
+
+    index = np.arange(size, dtype=np.uint64)
+    points = np.zeros((size, 2), dtype=np.uint64)
+    for bit in range(max(int(size - 1).bit_length(), 1)):
+        selected = ((index >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[selected] ^= scrambled[:, bit]
+    points ^= rng.integers(0, 1 << SOBOL_BITS, 2, dtype=np.uint64)
+    return (points.astype(float) + 0.5) / float(1 << SOBOL_BITS)
+
+
+def _polynomial(coefficients: tuple[float, ...], x: np.ndarray) -> np.ndarray:
+    result = np.zeros_like(x)
+    for coefficient in coefficients:
+        result = result * x + coefficient
+    return result
+
+
+def inverse_normal_cdf(p: np.ndarray) -> np.ndarray:
+    p = np.asarray(p, dtype=float)
+    result = np.empty_like(p)
+
+    central = (p >= _ACKLAM_LOW) & (p <= 1 - _ACKLAM_LOW)
+    q = p[central] - 0.5
+    r = q * q
+    result[central] = (
+        q * _polynomial(_ACKLAM_A, r) / _polynomial(_ACKLAM_B, r)
+    )
+
+    tail = ~central
+    q = np.sqrt(-2 * np.log(np.minimum(p[tail], 1 - p[tail])))
+    magnitude = _polynomial(_ACKLAM_C, q) / _polynomial(_ACKLAM_D, q)
+    result[tail] = np.where(p[tail] < 0.5, magnitude, -magnitude)
+    return result
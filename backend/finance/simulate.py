@@ -1,58 +1,42 @@
 from __future__ import annotations
 
-from dataclasses import asdict
-import random
-from typing import List
+from functools import lru_cache
+from itertools import accumulate
+from typing import Callable, Iterator, Optional
 
-from models import MortgageScheduleEntry, PropertyMetrics
+import numpy as np
+
+from finance.amortization import mortgage_payment, remaining_balance
+from finance.sampling import (
+    SHARD_SIZE,
+    batch_ids,
+    draw_rates,
+    shard_seeds,
+    shard_sizes,
+)
+from finance.statistics import (
+    SUMMARY_METRICS,
+    StreamingSummary,
+    metric_intervals,
+    precision_reached,
+    summarize_metrics,
+)
+from finance.vectorized import PropertyArrays, portfolio_totals, simulate_paths
+from models import PropertyMetrics
 from schemas import (
     MonteCarloRequest,
     MonteCarloResponse,
     MonteCarloRun,
     PortfolioResponse,
     PortfolioSimulationRequest,
+    Property,
     PropertyBreakdown,
+    PropertyMetricsSchema,
     YearlyPortfolioSnapshot,
 )
 
-
-def mortgage_payment(principal: float, annual_rate: float, years: int) -> float:
-    if annual_rate == 0:
-        return principal / (years * 12)
-    monthly_rate = annual_rate / 12
-    n_payments = years * 12
-    payment = principal * (monthly_rate * (1 + monthly_rate) ** n_payments) / (
-        (1 + monthly_rate) ** n_payments - 1
-    )
-    return payment
-
-
-def amortization_schedule(
-    principal: float, annual_rate: float, years: int
-) -> List[MortgageScheduleEntry]:
-    balance = principal
-    payment = mortgage_payment(principal, annual_rate, years)
-    monthly_rate = annual_rate / 12
-    schedule: List[MortgageScheduleEntry] = []
-
-    for month in range(1, years * 12 + 1):
-        interest = balance * monthly_rate
-        principal_paid = payment - interest
-        balance = max(balance - principal_paid, 0)
-        if balance < 1e-5:
-            balance = 0
-        schedule.append(
-            MortgageScheduleEntry(
-                month=month,
-                payment=payment,
-                principal=principal_paid,
-                interest=interest,
-                balance=balance,
-            )
-        )
-        if balance == 0:
-            break
-    return schedule
+# Iterations between precision checks when a run may stop early.
+PRECISION_CHECK_SIZE = 512
 
 
 def property_cashflow(
@@ -67,7 +51,6 @@ def property_cashflow(
     years: int,
 ) -> PropertyMetrics:
     principal = purchase_price - down_payment
-    schedule = amortization_schedule(principal, mortgage_rate, mortgage_years)
     annual_payment = mortgage_payment(principal, mortgage_rate, mortgage_years) * 12
 
     value = purchase_price
@@ -76,7 +59,6 @@ def property_cashflow(
 
     yearly_cashflows: list[float] = []
     equity: list[float] = []
-    balance_lookup = {entry.month: entry.balance for entry in schedule}
 
     for year in range(1, years + 1):
         value *= 1 + appreciation_rate
@@ -88,9 +70,10 @@ def property_cashflow(
         cashflow = total_income - total_expenses
         yearly_cashflows.append(cashflow)
 
-        month_index = min(year * 12, schedule[-1].month)
-        remaining_balance = balance_lookup.get(month_index, 0)
-        equity.append(max(value - remaining_balance, 0))
+        balance = remaining_balance(
+            principal, mortgage_rate, mortgage_years, year * 12
+        )
+        equity.append(max(value - balance, 0))
 
     total_cashflow = sum(yearly_cashflows)
     total_investment = down_payment + annual_expenses
@@ -104,51 +87,64 @@ def property_cashflow(
     )
 
 
+# Property results depend only on the property's own fields plus the shared
+# rates and horizon, so they are memoized across requests. Treat as read-only.
+memoized_property_cashflow = lru_cache(maxsize=20_000)(property_cashflow)
+
+
+def property_metrics(
+    prop: Property, appreciation_rate: float, rent_growth: float, years: int
+) -> PropertyMetrics:
+    return memoized_property_cashflow(
+        prop.purchase_price,
+        prop.down_payment,
+        prop.mortgage_rate,
+        prop.mortgage_years,
+        prop.annual_rent,
+        prop.annual_expenses,
+        appreciation_rate,
+        rent_growth,
+        years,
+    )
+
+
+def property_breakdown(name: str, metrics: PropertyMetrics) -> PropertyBreakdown:
+    # Metrics are already typed floats; skip re-validating them here.
+    return PropertyBreakdown.construct(
+        name=name, metrics=PropertyMetricsSchema.construct(**vars(metrics))
+    )
+
+
+def yearly_snapshots(yearly_cashflows: list[float]) -> list[YearlyPortfolioSnapshot]:
+    return [
+        YearlyPortfolioSnapshot.construct(
+            year=year + 1,
+            annual_cashflow=annual_cashflow,
+            cumulative_cashflow=cumulative_cashflow,
+        )
+        for year, (annual_cashflow, cumulative_cashflow) in enumerate(
+            zip(yearly_cashflows, accumulate(yearly_cashflows))
+        )
+    ]
+
+
 def simulate_portfolio(request: PortfolioSimulationRequest) -> PortfolioResponse:
     property_results: list[PropertyBreakdown] = []
     total_cashflow = 0.0
     total_equity = 0.0
     total_investment = 0.0
+    yearly_cashflows = [0.0] * request.years
 
     for prop in request.properties:
-        metrics = property_cashflow(
-            purchase_price=prop.purchase_price,
-            down_payment=prop.down_payment,
-            mortgage_rate=prop.mortgage_rate,
-            mortgage_years=prop.mortgage_years,
-            annual_rent=prop.annual_rent,
-            annual_expenses=prop.annual_expenses,
-            appreciation_rate=request.appreciation_rate,
-            rent_growth=request.rent_growth_rate,
-            years=request.years,
-        )
-
-        property_results.append(
-            PropertyBreakdown(
-                name=prop.name,
-                metrics=asdict(metrics),
-            )
+        metrics = property_metrics(
+            prop, request.appreciation_rate, request.rent_growth_rate, request.years
         )
+        property_results.append(property_breakdown(prop.name, metrics))
         total_cashflow += metrics.total_cashflow
         total_equity += metrics.equity
         total_investment += metrics.total_investment
-
-    yearly_snapshots: list[YearlyPortfolioSnapshot] = []
-    for year in range(request.years):
-        yearly_cashflow = sum(
-            prop.metrics.yearly_cashflows[year] for prop in property_results
-        )
-        cumulative_cashflow = sum(
-            sum(prop.metrics.yearly_cashflows[: year + 1])
-            for prop in property_results
-        )
-        yearly_snapshots.append(
-            YearlyPortfolioSnapshot(
-                year=year + 1,
-                annual_cashflow=yearly_cashflow,
-                cumulative_cashflow=cumulative_cashflow,
-            )
-        )
+        for year, cashflow in enumerate(metrics.yearly_cashflows):
+            yearly_cashflows[year] += cashflow
 
     return PortfolioResponse(
         properties=property_results,
@@ -157,50 +153,187 @@ def simulate_portfolio(request: PortfolioSimulationRequest) -> PortfolioResponse
             "equity": total_equity,
             "investment": total_investment,
         },
-        yearly=yearly_snapshots,
+        yearly=yearly_snapshots(yearly_cashflows),
     )
 
 
-def run_monte_carlo(request: MonteCarloRequest) -> MonteCarloResponse:
-    runs: list[MonteCarloRun] = []
-    results_cashflow: list[float] = []
-    results_equity: list[float] = []
+def simulate_portfolio_columnar(request: PortfolioSimulationRequest) -> dict:
+    """Simulate the portfolio as one array per metric instead of per-property models."""
+    paths = simulate_paths(
+        PropertyArrays.from_properties(request.properties),
+        request.years,
+        np.array([request.appreciation_rate]),
+        np.array([request.rent_growth_rate]),
+    )
+    cashflows = paths.cashflows[0]
+    equity = paths.equity[0, :, -1]
+    yearly_cashflows = cashflows.sum(axis=0)
 
-    for _ in range(request.iterations):
-        appreciation = random.gauss(
-            request.appreciation_rate, request.appreciation_volatility
-        )
-        rent_growth = random.gauss(
-            request.rent_growth_rate, request.rent_growth_volatility
-        )
-        adjusted_request = PortfolioSimulationRequest(
-            properties=request.properties,
-            years=request.years,
-            appreciation_rate=appreciation,
-            rent_growth_rate=rent_growth,
+    return {
+        "properties": {
+            "name": [prop.name for prop in request.properties],
+            "value": paths.values[0, :, -1].tolist(),
+            "annual_cashflow": cashflows[:, -1].tolist(),
+            "total_cashflow": cashflows.sum(axis=1).tolist(),
+            "total_investment": paths.investment.tolist(),
+            "equity": equity.tolist(),
+            "yearly_cashflows": cashflows.tolist(),
+        },
+        "totals": {
+            "cashflow": float(cashflows.sum()),
+            "equity": float(equity.sum()),
+            "investment": float(paths.investment.sum()),
+        },
+        "yearly": {
+            "year": list(range(1, request.years + 1)),
+            "annual_cashflow": yearly_cashflows.tolist(),
+            "cumulative_cashflow": np.cumsum(yearly_cashflows).tolist(),
+        },
+    }
+
+
+def iter_monte_carlo_chunks(
+    request: MonteCarloRequest, chunk_size: Optional[int] = None
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]]:
+    """Yield (appreciation, rent growth, batch ids, totals) for consecutive runs.
+
+    Rates are drawn a whole shard at a time so results for a seed do not
+    depend on ``chunk_size``.
+    """
+    arrays = PropertyArrays.from_properties(request.properties)
+    sizes = shard_sizes(request.iterations)
+    for index, (seed, size) in enumerate(
+        zip(shard_seeds(request.seed, len(sizes)), sizes)
+    ):
+        appreciation, rent_growth = draw_rates(
+            request, np.random.default_rng(seed), size
         )
-        portfolio = simulate_portfolio(adjusted_request)
-        total_cashflow = portfolio.totals["cashflow"]
-        total_equity = portfolio.totals["equity"]
-        results_cashflow.append(total_cashflow)
-        results_equity.append(total_equity)
-        runs.append(
-            MonteCarloRun(
-                appreciation_rate=appreciation,
-                rent_growth_rate=rent_growth,
-                totals=portfolio.totals,
+        batches = batch_ids(request.sampling, index * SHARD_SIZE, size)
+        step = chunk_size or size
+        for start in range(0, size, step):
+            chunk = slice(start, start + step)
+            totals = portfolio_totals(
+                arrays, request.years, appreciation[chunk], rent_growth[chunk]
             )
+            yield appreciation[chunk], rent_growth[chunk], batches[chunk], totals
+
+
+def monte_carlo_runs(
+    appreciation: np.ndarray,
+    rent_growth: np.ndarray,
+    totals: dict[str, np.ndarray],
+) -> list[dict]:
+    run_totals = {key: values.tolist() for key, values in totals.items()}
+    return [
+        {
+            "appreciation_rate": appreciation_rate,
+            "rent_growth_rate": rent_growth_rate,
+            "totals": {key: values[index] for key, values in run_totals.items()},
+        }
+        for index, (appreciation_rate, rent_growth_rate) in enumerate(
+            zip(appreciation.tolist(), rent_growth.tolist())
         )
+    ]
 
-    def summarize(values: list[float]) -> dict[str, float]:
-        if not values:
-            return {"min": 0.0, "max": 0.0, "mean": 0.0}
-        mean = sum(values) / len(values)
-        return {"min": min(values), "max": max(values), "mean": mean}
 
-    summary = {
-        "cashflow": summarize(results_cashflow),
-        "equity": summarize(results_equity),
-    }
+def run_monte_carlo(
+    request: MonteCarloRequest,
+    progress: Optional[Callable[[int], None]] = None,
+    chunk_size: Optional[int] = None,
+) -> MonteCarloResponse:
+    """Run the simulation, reporting completed iterations to ``progress``.
+
+    With ``target_precision`` set, the run stops at the first chunk boundary
+    where the mean cashflow and equity intervals are narrow enough.
+    """
+    summaries = {metric: StreamingSummary() for metric in SUMMARY_METRICS}
+    runs: list[MonteCarloRun] = []
+    completed = 0
+    stopping = request.target_precision is not None
+    if stopping and chunk_size is None:
+        chunk_size = PRECISION_CHECK_SIZE
+
+    for appreciation, rent_growth, batches, totals in iter_monte_carlo_chunks(
+        request, chunk_size
+    ):
+        for metric, summary in summaries.items():
+            summary.update(totals[metric], batches)
+        completed += len(appreciation)
+        if progress is not None:
+            progress(completed)
+        if not request.summary_only:
+            # Runs are built from typed floats; skip validating each one.
+            runs.extend(
+                MonteCarloRun.construct(**run)
+                for run in monte_carlo_runs(appreciation, rent_growth, totals)
+            )
+        if stopping and precision_reached(
+            summaries, request.target_precision, request.confidence_level
+        ):
+            break
+
+    summary, histograms = summarize_metrics(summaries)
+    intervals = metric_intervals(
+        summaries, request.confidence_level, request.sampling == "random"
+    )
+    return MonteCarloResponse.construct(
+        runs=runs,
+        summary=summary,
+        histograms=histograms,
+        iterations=completed,
+        intervals=intervals,
+        converged=_converged(summaries, request),
+    )
+
 
-    return MonteCarloResponse(runs=runs, summary=summary)
+def _converged(
+    summaries: dict[str, StreamingSummary], request: MonteCarloRequest
+) -> Optional[bool]:
+    if request.target_precision is None:
+        return None
+    return precision_reached(
+        summaries, request.target_precision, request.confidence_level
+    )
+
+
+def stream_monte_carlo(
+    request: MonteCarloRequest, chunk_size: int
+) -> Iterator[dict]:
+    """Yield one message per chunk of runs, then a final summary message."""
+    summaries = {metric: StreamingSummary() for metric in SUMMARY_METRICS}
+    completed = 0
+
+    for appreciation, rent_growth, batches, totals in iter_monte_carlo_chunks(
+        request, chunk_size
+    ):
+        for metric, summary in summaries.items():
+            summary.update(totals[metric], batches)
+        completed += len(appreciation)
+        yield {
+            "event": "runs",
+            "completed": completed,
+            "runs": (
+                []
+                if request.summary_only
+                else monte_carlo_runs(appreciation, rent_growth, totals)
+            ),
+            "summary": {
+                metric: summary.to_dict() for metric, summary in summaries.items()
+            },
+        }
+        if request.target_precision is not None and precision_reached(
+            summaries, request.target_precision, request.confidence_level
+        ):
+            break
+
+    summary, histograms = summarize_metrics(summaries)
+    yield {
+        "event": "summary",
+        "completed": completed,
+        "summary": summary,
+        "histograms": histograms,
+        "intervals": metric_intervals(
+            summaries, request.confidence_level, request.sampling == "random"
+        ),
+        "converged": _converged(summaries, request),
+    }
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import numpy as np
+
+from finance.vectorized import MAX_CHUNK_CELLS, PropertyArrays, simulate_paths
+from schemas import GoalSeekRequest
+
+# Portfolio totals map onto the per-property metrics they sum.
+METRIC_ALIASES = {"cashflow": "total_cashflow", "investment": "total_investment"}
+# Stop narrowing a bracket once it is this small relative to its position.
+BRACKET_TOLERANCE = 1e-12
+
+
+def property_metric(
+    arrays: PropertyArrays,
+    years: int,
+    appreciation_rate: float,
+    rent_growth_rate: float,
+    metric: str,
+) -> np.ndarray:
+    """One ``PropertyMetrics`` field for every property, in bounded chunks."""
+    parts = []
+    chunk = max(MAX_CHUNK_CELLS // years, 1)
+    for start in range(0, len(arrays), chunk):
+        index = np.arange(start, min(start + chunk, len(arrays)))
+        paths = simulate_paths(
+            arrays.take(index),
+            years,
+            np.array([appreciation_rate]),
+            np.array([rent_growth_rate]),
+        )
+        if metric == "value":
+            parts.append(paths.values[0, :, -1])
+        elif metric == "annual_cashflow":
+            parts.append(paths.cashflows[0, :, -1])
+        elif metric == "total_cashflow":
+            parts.append(paths.cashflows[0].sum(axis=1))
+        elif metric == "total_investment":
+            parts.append(paths.investment)
+        else:
+            parts.append(paths.equity[0, :, -1])
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def solve_goal(request: GoalSeekRequest) -> dict:
+    """Solve metric(field) = target for every problem with one batched root-finder.
+
+    Uses the Illinois variant of regula falsi: it keeps a sign-changing
+    bracket like bisection, but converges superlinearly on the smooth,
+    mostly linear responses of the cashflow model. Each iteration evaluates
+    all unfinished problems at once.
+    """
+    arrays = PropertyArrays.from_properties(request.properties)
+    metric = METRIC_ALIASES.get(request.metric, request.metric)
+    targets = np.asarray(request.targets, dtype=float)
+    count = len(arrays)
+    if request.scope == "property":
+        # One problem per (property, target), property-major.
+        names = [prop.name for prop in request.properties for _ in targets]
+        problem_targets = np.tile(targets, count)
+        property_of = np.repeat(np.arange(count), len(targets))
+    else:
+        names = [None] * len(targets)
+        problem_targets = targets
+
+    def residual(problems: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        if request.scope == "property":
+            index = property_of[problems]
+        else:
+            # Every property takes the problem's candidate; the metric is summed.
+            index = np.tile(np.arange(count), len(problems))
+            candidates = np.repeat(candidates, count)
+        values = property_metric(
+            arrays.take(index, **{request.solve_for: candidates}),
+            request.years,
+            request.appreciation_rate,
+            request.rent_growth_rate,
+            metric,
+        )
+        if request.scope == "portfolio":
+            values = values.reshape(len(problems), count).sum(axis=1)
+        return values - problem_targets[problems]
+
+    size = len(problem_targets)
+    everything = np.arange(size)
+    lower = np.full(size, request.lower)
+    upper = np.full(size, request.upper)
+    # Above the price the loan turns negative and "pays" the owner. An empty
+    # portfolio has no price to respect.
+    if request.solve_for == "down_payment" and count:
+        if request.scope == "property":
+            price = arrays.purchase_price[property_of]
+        else:
+            price = np.full(size, arrays.purchase_price.min())
+        upper = np.minimum(upper, price)
+    feasible = lower <= upper
+    upper = np.maximum(upper, lower)
+    f_lower = residual(everything, lower)
+    f_upper = residual(everything, upper)
+
+    value = np.full(size, np.nan)
+    error = np.full(size, np.nan)
+    iterations = np.zeros(size, dtype=int)
+    converged = np.zeros(size, dtype=bool)
+    for bound, f_bound in ((lower, f_lower), (upper, f_upper)):
+        hit = feasible & ~converged & (np.abs(f_bound) <= request.tolerance)
+        value[hit], error[hit], converged[hit] = bound[hit], f_bound[hit], True
+    bracketed = converged | (feasible & (np.sign(f_lower) != np.sign(f_upper)))
+    # Which end was replaced last: -1 lower, +1 upper, 0 neither yet.
+    side = np.zeros(size, dtype=int)
+
+    active = np.flatnonzero(bracketed & ~converged)
+    for _ in range(request.max_iterations):
+        if active.size == 0:
+            break
+        lo, hi = lower[active], upper[active]
+        f_lo, f_hi = f_lower[active], f_upper[active]
+        candidates = (lo * f_hi - hi * f_lo) / (f_hi - f_lo)
+        # Fall back to the midpoint if interpolation leaves the bracket.
+        inside = (candidates > np.minimum(lo, hi)) & (candidates < np.maximum(lo, hi))
+        candidates[~inside] = ((lo + hi) / 2)[~inside]
+        f_candidates = residual(active, candidates)
+        iterations[active] += 1
+        value[active], error[active] = candidates, f_candidates
+
+        replace_upper = np.sign(f_candidates) == np.sign(f_hi)
+        upper_rows, lower_rows = active[replace_upper], active[~replace_upper]
+        upper[upper_rows] = candidates[replace_upper]
+        f_upper[upper_rows] = f_candidates[replace_upper]
+        lower[lower_rows] = candidates[~replace_upper]
+        f_lower[lower_rows] = f_candidates[~replace_upper]
+        # Illinois step: halve the stale end when the same end moves twice.
+        f_lower[upper_rows[side[upper_rows] == 1]] /= 2
+        f_upper[lower_rows[side[lower_rows] == -1]] /= 2
+        side[upper_rows], side[lower_rows] = 1, -1
+
+        done = np.abs(f_candidates) <= request.tolerance
+        converged[active[done]] = True
+        width = np.abs(upper[active] - lower[active])
+        collapsed = width <= BRACKET_TOLERANCE * (1 + np.abs(candidates))
+        active = active[~done & ~collapsed]
+
+    statuses = np.where(
+        converged, "converged", np.where(bracketed, "not_converged", "not_bracketed")
+    )
+    return {
+        "metric": request.metric,
+        "solve_for": request.solve_for,
+        "solutions": [
+            {
+                "name": name,
+                "target": target,
+                "value": None if status == "not_bracketed" else solution,
+                "status": status,
+                "iterations": steps,
+                "residual": None if status == "not_bracketed" else residual_value,
+            }
+            for name, target, solution, status, steps, residual_value in zip(
+                names,
+                problem_targets.tolist(),
+                value.tolist(),
+                statuses.tolist(),
+                iterations.tolist(),
+                error.tolist(),
+            )
+        ],
+    }
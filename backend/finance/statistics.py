@@ -0,0 +1,610 @@
+from __future__ import annotations
+
+from functools import lru_cache
+import math
+from statistics import NormalDist
+from typing import Optional
+
+import numpy as np
+
+SUMMARY_METRICS = ("cashflow", "equity")
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 20
+# Values kept verbatim, so runs that return every run (up to 1000) get exact
+# percentiles and histograms.
+EXACT_VALUES = 1000
+# Bins held by the fixed-width histogram once values are no longer kept.
+FINE_BINS = 4096
+# Batches needed before a standard error is trusted to stop a run early. Means
+# of randomized designs can be skewed, so a t interval over only a few of them
+# still undercovers.
+MIN_PRECISION_BATCHES = 30
+# Degrees of freedom from which the t quantile uses its series expansion.
+T_EXPANSION_DEGREES = 100
+
+
+def _merge_weighted(
+    weight: float, mean: float, m2: float, other: tuple[float, float, float]
+) -> tuple[float, float, float]:
+    """Chan's pairwise update for weighted (total weight, mean, M2) moments."""
+    other_weight, other_mean, other_m2 = other
+    total = weight + other_weight
+    if total == 0:
+        return weight, mean, m2
+    delta = other_mean - mean
+    return (
+        total,
+        mean + delta * other_weight / total,
+        m2 + other_m2 + delta**2 * weight * other_weight / total,
+    )
+
+
+def _weighted_moments(
+    weights: np.ndarray, values: np.ndarray
+) -> tuple[float, float, float]:
+    total = float(weights.sum())
+    mean = float((weights * values).sum() / total)
+    return total, mean, float((weights * (values - mean) ** 2).sum())
+
+
+class BatchMeans:
+    """Standard error of a mean estimated from independent batches of draws.
+
+    A batch is a single draw, an antithetic pair or one randomized design.
+    Batches may be of unequal size; the variance of the overall mean is
+    ``B / (B - 1) * sum(n_b**2 * (m_b - m)**2) / N**2``. A batch may be split
+    across updates as long as its draws arrive contiguously with one id.
+    """
+
+    def __init__(self) -> None:
+        self.batches = 0
+        self.count = 0.0
+        self.mean = 0.0
+        # Moments of batch means weighted by squared batch size.
+        self._square_weight = 0.0
+        self._square_mean = 0.0
+        self._square_m2 = 0.0
+        self._pending: Optional[tuple[int, int, float]] = None
+
+    def update(self, values: np.ndarray, ids: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        counts = np.diff(np.append(starts, values.size))
+        sums = np.add.reduceat(values, starts)
+        if self._pending is not None:
+            pending_id, pending_count, pending_sum = self._pending
+            if pending_id == ids[0]:
+                counts[0] += pending_count
+                sums[0] += pending_sum
+            else:
+                self._add(np.array([pending_count]), np.array([pending_sum]))
+        # The last batch may continue in the next update.
+        self._pending = (int(ids[-1]), int(counts[-1]), float(sums[-1]))
+        self._add(counts[:-1], sums[:-1])
+
+    def flush(self) -> None:
+        if self._pending is not None:
+            _, count, total = self._pending
+            self._add(np.array([count]), np.array([total]))
+            self._pending = None
+
+    def merge(self, other: "BatchMeans") -> None:
+        self.flush()
+        other.flush()
+        self.batches += other.batches
+        self.count, self.mean, _ = _merge_weighted(
+            self.count, self.mean, 0.0, (other.count, other.mean, 0.0)
+        )
+        self._square_weight, self._square_mean, self._square_m2 = _merge_weighted(
+            self._square_weight,
+            self._square_mean,
+            self._square_m2,
+            (other._square_weight, other._square_mean, other._square_m2),
+        )
+
+    @property
+    def std_error(self) -> Optional[float]:
+        if self.batches < 2:
+            return None
+        spread = (
+            self._square_m2
+            + self._square_weight * (self._square_mean - self.mean) ** 2
+        )
+        variance = self.batches / (self.batches - 1) * spread / self.count**2
+        return math.sqrt(variance)
+
+    def _add(self, counts: np.ndarray, sums: np.ndarray) -> None:
+        if counts.size == 0:
+            return
+        counts = counts.astype(float)
+        means = sums / counts
+        self.batches += counts.size
+        self.count, self.mean, _ = _merge_weighted(
+            self.count, self.mean, 0.0, _weighted_moments(counts, means)
+        )
+        self._square_weight, self._square_mean, self._square_m2 = _merge_weighted(
+            self._square_weight,
+            self._square_mean,
+            self._square_m2,
+            _weighted_moments(counts**2, means),
+        )
+
+
+class BinnedHistogram:
+    """Exact counts in equal bins whose width is a power of two.
+
+    Bin ``i`` holds values in ``[i * width, (i + 1) * width)``. When values
+    fall outside the current bins, pairs of bins are merged until at most
+    ``max_bins`` remain, so memory stays bounded and no count is ever moved
+    to a bin its value does not belong to. Because every width is a power of
+    two, histograms built from different chunks of a stream merge exactly.
+    """
+
+    def __init__(self, width: float, max_bins: int = FINE_BINS):
+        self.width = width
+        self.max_bins = max_bins
+        self.origin = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def for_values(cls, values: np.ndarray) -> "BinnedHistogram":
+        """Start with bins about ``FINE_BINS / 2``..``FINE_BINS`` to the range."""
+        span = float(values.max() - values.min())
+        # Identical values get bins near float resolution; they widen on demand.
+        scale = span / FINE_BINS or max(float(np.abs(values).max()), 1.0) * 2**-40
+        histogram = cls(_power_of_two_at_most(scale))
+        histogram.add(values)
+        return histogram
+
+    def add(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        self._widen_to(float(values.min()), float(values.max()))
+        indices = np.floor(values / self.width).astype(np.int64)
+        self._add_counts(
+            int(indices.min()),
+            np.bincount(indices - indices.min()).astype(np.int64),
+        )
+
+    def merge(self, other: "BinnedHistogram") -> None:
+        if other.counts.size == 0:
+            return
+        other = other.coarsened(self.width)
+        while self.width < other.width:
+            self._halve()
+        last = other.origin + other.counts.size - 1
+        self._widen_to(other.origin * other.width, last * other.width)
+        other = other.coarsened(self.width)
+        self._add_counts(other.origin, other.counts)
+
+    def coarsened(self, width: float) -> "BinnedHistogram":
+        """A copy with bins of at least ``width`` (a power of two)."""
+        copy = BinnedHistogram(self.width, self.max_bins)
+        copy.origin, copy.counts = self.origin, self.counts
+        while copy.width < width:
+            copy._halve()
+        return copy
+
+    def canonical(self, minimum: float, maximum: float, bins: int) -> "BinnedHistogram":
+        """Coarsen to the narrowest power-of-two width spanning the range in ``bins``.
+
+        The result depends only on the values added, not on how they were
+        chunked or merged, as long as ``bins`` is at most half ``max_bins``.
+        """
+        width = self.width
+        while math.floor(maximum / width) - math.floor(minimum / width) >= bins:
+            width *= 2
+        return self.coarsened(width)
+
+    def edges(self) -> np.ndarray:
+        return (self.origin + np.arange(self.counts.size + 1)) * self.width
+
+    def _add_counts(self, origin: int, counts: np.ndarray) -> None:
+        if self.counts.size == 0:
+            self.origin, self.counts = origin, counts.copy()
+        else:
+            start = min(self.origin, origin)
+            end = max(self.origin + self.counts.size, origin + counts.size)
+            merged = np.zeros(end - start, dtype=np.int64)
+            merged[self.origin - start : self.origin - start + self.counts.size] = (
+                self.counts
+            )
+            merged[origin - start : origin - start + counts.size] += counts
+            self.origin, self.counts = start, merged
+        while self.counts.size > self.max_bins:
+            self._halve()
+        # Trim empty bins left at either end by coarsening.
+        nonzero = np.flatnonzero(self.counts)
+        if nonzero.size:
+            self.origin += int(nonzero[0])
+            self.counts = self.counts[nonzero[0] : nonzero[-1] + 1]
+
+    def _widen_to(self, low: float, high: float) -> None:
+        """Coarsen until the current bins and ``[low, high]`` span ``max_bins``.
+
+        Done before counting, so a jump from a narrow range to a wide one
+        never allocates more than ``max_bins`` bins.
+        """
+        while True:
+            first = math.floor(low / self.width)
+            last = math.floor(high / self.width)
+            if self.counts.size:
+                first = min(first, self.origin)
+                last = max(last, self.origin + self.counts.size - 1)
+            if last - first < self.max_bins:
+                return
+            self._halve()
+
+    def _halve(self) -> None:
+        """Merge neighbouring bins, doubling the width."""
+        start = self.origin // 2
+        positions = (self.origin + np.arange(self.counts.size)) // 2 - start
+        self.counts = np.bincount(positions, weights=self.counts).astype(np.int64)
+        self.origin = start
+        self.width *= 2
+
+
+def _power_of_two_at_most(value: float) -> float:
+    return math.ldexp(1.0, math.frexp(value)[1] - 1)
+
+
+class StreamingSummary:
+    """Mergeable summary of a value stream held in bounded memory.
+
+    Mean and variance use Welford/Chan updates. Up to ``EXACT_VALUES``
+    values are kept as is, giving exact percentiles and histograms. Beyond
+    that, values go into a ``BinnedHistogram`` and a log-bucketed sketch
+    whose quantiles are within ``relative_accuracy`` of the true value;
+    each percentile is read from whichever of the two is finer there.
+    """
+
+    def __init__(
+        self, relative_accuracy: float = 0.01, zero_threshold: float = 1e-9
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.zero_threshold = zero_threshold
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._values: Optional[np.ndarray] = np.zeros(0)
+        self._bins: Optional[BinnedHistogram] = None
+        self._positive: dict[int, int] = {}
+        self._negative: dict[int, int] = {}
+        self._zero = 0
+        self.batch_means = BatchMeans()
+
+    def update(
+        self, values: np.ndarray, batch_ids: Optional[np.ndarray] = None
+    ) -> None:
+        """Add values; ``batch_ids`` groups correlated draws, else each stands alone."""
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        if batch_ids is None:
+            batch_ids = np.arange(self.count, self.count + values.size)
+        self.batch_means.update(values, batch_ids)
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        self._merge_moments(values.size, batch_mean, batch_m2)
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._add_values(values)
+
+        magnitudes = np.abs(values)
+        self._zero += int((magnitudes <= self.zero_threshold).sum())
+        self._add_buckets(self._positive, values[values > self.zero_threshold])
+        self._add_buckets(self._negative, -values[values < -self.zero_threshold])
+
+    def merge(self, other: "StreamingSummary") -> None:
+        if other.count == 0:
+            return
+        self._merge_moments(other.count, other.mean, other._m2)
+        self.batch_means.merge(other.batch_means)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        if other._values is not None:
+            self._add_values(other._values)
+        else:
+            if self._bins is None:
+                self._bins = other._bins.coarsened(other._bins.width)
+                self._bins.add(self._values)
+                self._values = None
+            else:
+                self._bins.merge(other._bins)
+        self._zero += other._zero
+        for store, incoming in (
+            (self._positive, other._positive),
+            (self._negative, other._negative),
+        ):
+            for index, count in incoming.items():
+                store[index] = store.get(index, 0) + count
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def quantile(self, q: float) -> float:
+        if self._values is not None:
+            return float(np.quantile(self._values, q)) if self.count else 0.0
+        return self._at_rank(q * (self.count - 1))
+
+    def mean_half_width(self, confidence_level: float) -> float:
+        """Confidence-interval half-width of the mean over completed batches."""
+        error = self.batch_means.std_error
+        if error is None or self.batch_means.batches < MIN_PRECISION_BATCHES:
+            return math.inf
+        return t_score(confidence_level, self.batch_means.batches - 1) * error
+
+    def intervals(
+        self, confidence_level: float, independent: bool = True
+    ) -> dict[str, dict[str, float]]:
+        """Confidence intervals for the mean, standard deviation and percentiles.
+
+        The mean uses the batch standard error with a Student-t quantile, as
+        correlated designs may have only a handful of batches. The standard
+        deviation uses its large-sample normal approximation. Percentiles use
+        distribution-free order-statistic bounds, widened by the summary's
+        resolution; they assume independent draws, so are only reported when
+        ``independent`` is set.
+        """
+        self.batch_means.flush()
+        z = z_score(confidence_level)
+        intervals = {}
+        error = self.batch_means.std_error
+        if error is not None:
+            t = t_score(confidence_level, self.batch_means.batches - 1)
+            intervals["mean"] = _interval(self.mean, error, t)
+        if self.count > 1:
+            std_error = self.std / math.sqrt(2 * (self.count - 1))
+            intervals["std"] = _interval(self.std, std_error, z)
+        if not independent:
+            return intervals
+        for percentile in PERCENTILES:
+            q = percentile / 100
+            rank = q * (self.count - 1)
+            spread = z * math.sqrt(self.count * q * (1 - q))
+            low, low_error = self._rank_value(max(math.floor(rank - spread), 0))
+            high, high_error = self._rank_value(
+                min(math.ceil(rank + spread), self.count - 1)
+            )
+            # A coarse summary cannot resolve values closer than its error bound.
+            resolution = max(low_error, high_error)
+            low, high = low - low_error, high + high_error
+            intervals[f"p{percentile}"] = {
+                "low": low,
+                "high": high,
+                "std_error": max((high - low) / (2 * z), resolution),
+            }
+        return intervals
+
+    def _at_rank(self, rank: float) -> float:
+        return self._rank_value(rank)[0]
+
+    def _rank_value(self, rank: float) -> tuple[float, float]:
+        """The value at ``rank`` (0-based) and a bound on its error."""
+        if self.count == 0:
+            return 0.0, 0.0
+        if self._values is not None:
+            ordered = np.sort(self._values)
+            return float(ordered[min(int(rank), self.count - 1)]), 0.0
+        sketched = self._sketch_rank_value(rank)
+        binned = self._binned_rank_value(rank)
+        return min(sketched, binned, key=lambda estimate: estimate[1])
+
+    def _sketch_rank_value(self, rank: float) -> tuple[float, float]:
+        seen = 0
+        for value, count in self._buckets():
+            seen += count
+            if seen > rank:
+                value = min(max(value, self.minimum), self.maximum)
+                return value, self.relative_accuracy * abs(value)
+        return self.maximum, 0.0
+
+    def _binned_rank_value(self, rank: float) -> tuple[float, float]:
+        bins = self._bins.canonical(self.minimum, self.maximum, FINE_BINS // 2)
+        cumulative = np.cumsum(bins.counts)
+        index = int(np.searchsorted(cumulative, rank, side="right"))
+        index = min(index, bins.counts.size - 1)
+        before = cumulative[index] - bins.counts[index]
+        # Spread each bin's values evenly across its width.
+        fraction = (rank - before + 0.5) / bins.counts[index]
+        value = (bins.origin + index + min(max(fraction, 0.0), 1.0)) * bins.width
+        return min(max(float(value), self.minimum), self.maximum), bins.width
+
+    def to_dict(self) -> dict[str, float]:
+        if self.count == 0:
+            summary = {"min": 0.0, "max": 0.0, "mean": 0.0, "std": 0.0}
+        else:
+            summary = {
+                "min": self.minimum,
+                "max": self.maximum,
+                "mean": self.mean,
+                "std": self.std,
+            }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = self.quantile(percentile / 100)
+        return summary
+
+    def histogram(self, bins: int = HISTOGRAM_BINS) -> dict[str, list]:
+        """``bins`` equal bins over the exact values, else ``bins``..``2 * bins``.
+
+        Summarized streams report bins of a power-of-two width from the
+        fixed-width histogram, so the counts are exact but the outer edges
+        may extend past the minimum and maximum.
+        """
+        if self.count == 0:
+            return {"edges": [], "counts": []}
+        if self._values is not None:
+            counts, edges = np.histogram(self._values, bins=bins)
+            return {"edges": edges.tolist(), "counts": counts.tolist()}
+        if self.minimum == self.maximum:
+            counts, edges = np.histogram(
+                [self.minimum], bins=bins, weights=[self.count]
+            )
+            return {"edges": edges.tolist(), "counts": counts.astype(int).tolist()}
+        binned = self._bins.canonical(self.minimum, self.maximum, 2 * bins)
+        return {
+            "edges": binned.edges().tolist(),
+            "counts": binned.counts.tolist(),
+        }
+
+    def _add_values(self, values: np.ndarray) -> None:
+        if self._values is not None:
+            if self._values.size + values.size <= EXACT_VALUES:
+                self._values = np.concatenate((self._values, values))
+                return
+            values = np.concatenate((self._values, values))
+            self._values = None
+        if self._bins is None:
+            self._bins = BinnedHistogram.for_values(values)
+        else:
+            self._bins.add(values)
+
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+
+    def _add_buckets(self, store: dict[int, int], magnitudes: np.ndarray) -> None:
+        if magnitudes.size == 0:
+            return
+        indices = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        unique, counts = np.unique(indices, return_counts=True)
+        for index, count in zip(unique.tolist(), counts.tolist()):
+            store[index] = store.get(index, 0) + count
+
+    def _bucket_value(self, index: int) -> float:
+        return 2 * self._gamma**index / (self._gamma + 1)
+
+    def _buckets(self):
+        """Yield (representative value, count) in ascending value order."""
+        for index in sorted(self._negative, reverse=True):
+            yield -self._bucket_value(index), self._negative[index]
+        if self._zero:
+            yield 0.0, self._zero
+        for index in sorted(self._positive):
+            yield self._bucket_value(index), self._positive[index]
+
+
+def z_score(confidence_level: float) -> float:
+    return NormalDist().inv_cdf((1 + confidence_level) / 2)
+
+
+@lru_cache(maxsize=1024)
+def t_score(confidence_level: float, degrees_of_freedom: int) -> float:
+    """Two-sided Student-t quantile, found by bisection on its tail probability."""
+    if degrees_of_freedom >= T_EXPANSION_DEGREES:
+        return _t_expansion(z_score(confidence_level), degrees_of_freedom)
+    tail = (1 - confidence_level) / 2
+    low, high = 0.0, z_score(confidence_level)
+    while _t_upper_tail(high, degrees_of_freedom) > tail:
+        low, high = high, 2 * high
+    for _ in range(100):
+        middle = (low + high) / 2
+        if _t_upper_tail(middle, degrees_of_freedom) > tail:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def _t_expansion(z: float, degrees_of_freedom: int) -> float:
+    """Cornish-Fisher expansion of the t quantile around the normal one."""
+    v = degrees_of_freedom
+    return (
+        z
+        + (z**3 + z) / (4 * v)
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2)
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3)
+    )
+
+
+def _t_upper_tail(t: float, degrees_of_freedom: int) -> float:
+    """P(T > t) for t >= 0, via the regularized incomplete beta function."""
+    x = degrees_of_freedom / (degrees_of_freedom + t * t)
+    return _incomplete_beta(degrees_of_freedom / 2, 0.5, x) / 2
+
+
+def _incomplete_beta(a: float, b: float, x: float) -> float:
+    """Regularized I_x(a, b), using the continued fraction on the faster side."""
+    if x <= 0 or x >= 1:
+        return max(min(x, 1.0), 0.0)
+    front = math.exp(
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log1p(-x)
+    )
+    if x < (a + 1) / (a + b + 2):
+        return front * _beta_fraction(a, b, x) / a
+    return 1 - front * _beta_fraction(b, a, 1 - x) / b
+
+
+def _beta_fraction(a: float, b: float, x: float) -> float:
+    """Lentz's evaluation of the incomplete beta continued fraction."""
+    tiny = 1e-300
+    c, d = 1.0, 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 10_000):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1) < 1e-15:
+            break
+    return result
+
+
+def _interval(estimate: float, std_error: float, z: float) -> dict[str, float]:
+    return {
+        "low": estimate - z * std_error,
+        "high": estimate + z * std_error,
+        "std_error": std_error,
+    }
+
+
+def precision_reached(
+    summaries: dict[str, StreamingSummary],
+    target_precision: float,
+    confidence_level: float,
+) -> bool:
+    return all(
+        summary.mean_half_width(confidence_level) <= target_precision
+        for summary in summaries.values()
+    )
+
+
+def metric_intervals(
+    summaries: dict[str, StreamingSummary],
+    confidence_level: float,
+    independent: bool = True,
+) -> dict[str, dict[str, dict[str, float]]]:
+    return {
+        metric: summary.intervals(confidence_level, independent)
+        for metric, summary in summaries.items()
+    }
+
+
+def summarize_metrics(
+    summaries: dict[str, StreamingSummary], bins: int = HISTOGRAM_BINS
+) -> tuple[dict[str, dict[str, float]], dict[str, dict[str, list]]]:
+    return (
+        {metric: summary.to_dict() for metric, summary in summaries.items()},
+        {metric: summary.histogram(bins) for metric, summary in summaries.items()},
+    )
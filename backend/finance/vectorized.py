@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+from finance import amortization
+from schemas import Property
+
+# Upper bound on iterations x properties x years cells evaluated at once.
+MAX_CHUNK_CELLS = 4_000_000
+
+
+@dataclass
+class PropertyArrays:
+    purchase_price: np.ndarray
+    down_payment: np.ndarray
+    mortgage_rate: np.ndarray
+    mortgage_years: np.ndarray
+    annual_rent: np.ndarray
+    annual_expenses: np.ndarray
+
+    @classmethod
+    def from_properties(cls, properties: Sequence[Property]) -> "PropertyArrays":
+        return cls(
+            purchase_price=np.array(
+                [prop.purchase_price for prop in properties], dtype=float
+            ),
+            down_payment=np.array(
+                [prop.down_payment for prop in properties], dtype=float
+            ),
+            mortgage_rate=np.array(
+                [prop.mortgage_rate for prop in properties], dtype=float
+            ),
+            mortgage_years=np.array(
+                [prop.mortgage_years for prop in properties], dtype=int
+            ),
+            annual_rent=np.array(
+                [prop.annual_rent for prop in properties], dtype=float
+            ),
+            annual_expenses=np.array(
+                [prop.annual_expenses for prop in properties], dtype=float
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.purchase_price)
+
+    def take(self, index: np.ndarray, **overrides: np.ndarray) -> "PropertyArrays":
+        """Select (and repeat) properties by index, replacing any given columns."""
+        columns = {
+            name: overrides.get(name, getattr(self, name)[index])
+            for name in self.__dataclass_fields__
+        }
+        return PropertyArrays(**columns)
+
+
+@dataclass
+class PortfolioPaths:
+    """Per-property yearly outcomes shaped (iterations, properties, years)."""
+
+    values: np.ndarray
+    cashflows: np.ndarray
+    equity: np.ndarray
+    investment: np.ndarray
+
+    def totals(self) -> dict[str, np.ndarray]:
+        iterations = self.cashflows.shape[0]
+        return {
+            "cashflow": self.cashflows.sum(axis=(1, 2)),
+            "equity": self.equity[:, :, -1].sum(axis=1),
+            "investment": np.full(iterations, self.investment.sum()),
+        }
+
+    def horizon_totals(self, horizons: Sequence[int]) -> dict[str, np.ndarray]:
+        """Portfolio totals as of each horizon year, shaped (iterations, horizons)."""
+        index = np.asarray(horizons, dtype=int) - 1
+        cumulative = self.cashflows.sum(axis=1).cumsum(axis=1)
+        shape = (self.cashflows.shape[0], len(index))
+        return {
+            "cashflow": cumulative[:, index],
+            "equity": self.equity.sum(axis=1)[:, index],
+            "investment": np.full(shape, self.investment.sum()),
+        }
+
+
+def remaining_balances(arrays: PropertyArrays, years: int) -> np.ndarray:
+    """Loan balance at the end of each year, shaped (properties, years)."""
+    months = np.arange(1, years + 1) * 12
+    return amortization.remaining_balances(
+        (arrays.purchase_price - arrays.down_payment)[:, None],
+        arrays.mortgage_rate[:, None],
+        arrays.mortgage_years[:, None],
+        months[None, :],
+    )
+
+
+def annual_payments(arrays: PropertyArrays) -> np.ndarray:
+    return (
+        amortization.mortgage_payments(
+            arrays.purchase_price - arrays.down_payment,
+            arrays.mortgage_rate,
+            arrays.mortgage_years,
+        )
+        * 12
+    )
+
+
+def simulate_paths(
+    arrays: PropertyArrays,
+    years: int,
+    appreciation_rates: np.ndarray,
+    rent_growth_rates: np.ndarray,
+) -> PortfolioPaths:
+    """Evaluate ``property_cashflow`` for every (rate draw, property, year) at once."""
+    appreciation_rates = np.asarray(appreciation_rates, dtype=float)
+    rent_growth_rates = np.asarray(rent_growth_rates, dtype=float)
+    exponents = np.arange(1, years + 1, dtype=float)
+
+    # Growth factors broadcast as (iterations, 1, years).
+    return _paths_from_growth(
+        arrays,
+        years,
+        (1 + appreciation_rates[:, None, None]) ** exponents,
+        (1 + rent_growth_rates[:, None, None]) ** exponents,
+        (1 + rent_growth_rates[:, None, None] / 2) ** exponents,
+    )
+
+
+def simulate_rate_paths(
+    arrays: PropertyArrays,
+    appreciation_rates: np.ndarray,
+    rent_growth_rates: np.ndarray,
+) -> PortfolioPaths:
+    """Evaluate ``property_cashflow`` along rates that vary by property and year.
+
+    Rates are shaped (iterations, properties, years); each year compounds on
+    the previous one exactly as the scalar loop does.
+    """
+    return _paths_from_growth(
+        arrays,
+        appreciation_rates.shape[-1],
+        np.cumprod(1 + appreciation_rates, axis=-1),
+        np.cumprod(1 + rent_growth_rates, axis=-1),
+        np.cumprod(1 + rent_growth_rates / 2, axis=-1),
+    )
+
+
+def _paths_from_growth(
+    arrays: PropertyArrays,
+    years: int,
+    value_growth: np.ndarray,
+    rent_factor: np.ndarray,
+    expense_factor: np.ndarray,
+) -> PortfolioPaths:
+    values = arrays.purchase_price[None, :, None] * value_growth
+    rent = arrays.annual_rent[None, :, None] * rent_factor
+    expenses = arrays.annual_expenses[None, :, None] * expense_factor
+    payment = annual_payments(arrays)[None, :, None]
+
+    cashflows = rent - expenses - np.minimum(payment, rent)
+    equity = np.maximum(values - remaining_balances(arrays, years)[None, :, :], 0)
+
+    return PortfolioPaths(
+        values=values,
+        cashflows=cashflows,
+        equity=equity,
+        investment=arrays.down_payment + arrays.annual_expenses,
+    )
+
+
+def portfolio_totals(
+    arrays: PropertyArrays,
+    years: int,
+    appreciation_rates: np.ndarray,
+    rent_growth_rates: np.ndarray,
+    horizons: Optional[Sequence[int]] = None,
+) -> dict[str, np.ndarray]:
+    """Per-iteration portfolio totals, evaluated in memory-bounded chunks.
+
+    With ``horizons`` each total gains a trailing axis holding its value as of
+    each of those years instead of only the final one.
+    """
+    chunk = max(MAX_CHUNK_CELLS // max(len(arrays) * years, 1), 1)
+    parts = []
+    for start in range(0, len(appreciation_rates), chunk):
+        paths = simulate_paths(
+            arrays,
+            years,
+            appreciation_rates[start : start + chunk],
+            rent_growth_rates[start : start + chunk],
+        )
+        parts.append(
+            paths.totals() if horizons is None else paths.horizon_totals(horizons)
+        )
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
@@ -0,0 +1,148 @@
+"""In-process background job queue for long-running simulations."""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+import uuid
+
+from pydantic import BaseModel
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once cancellation is requested."""
+
+
+class JobQueueFull(Exception):
+    """Raised when no queue slot is free for a new job."""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    total: int
+    status: str = "queued"
+    progress: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+    future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+
+# A job body receives a progress callback taking the number of completed units.
+JobFunction = Callable[[Callable[[int], None]], BaseModel]
+
+
+class JobManager:
+    """Bounded worker pool with queueing, progress, cancellation and expiry.
+
+    Jobs run on a dedicated thread pool, separate from the one serving sync
+    request handlers, so queued simulations never delay short requests.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queued: int = 32,
+        retention_seconds: float = 900,
+    ):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="simulation-job"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, total: int, function: JobFunction) -> Job:
+        with self._lock:
+            self._purge_expired()
+            active = sum(not job.finished for job in self._jobs.values())
+            if active >= self.max_workers + self.max_queued:
+                raise JobQueueFull()
+            job = Job(id=uuid.uuid4().hex, kind=kind, total=total)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, function)
+            return job
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            self._purge_expired()
+            return self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a pending job, or forget one that has already finished."""
+        with self._lock:
+            job = self._jobs[job_id]
+            if job.finished:
+                del self._jobs[job_id]
+                return job
+            job.cancel_requested.set()
+            if job.future is not None and job.future.cancel():
+                self._finish(job, "cancelled")
+            return job
+
+    def _run(self, job: Job, function: JobFunction) -> None:
+        with self._lock:
+            if job.cancel_requested.is_set():
+                self._finish(job, "cancelled")
+                return
+            job.status = "running"
+            job.started_at = time.time()
+
+        def report(completed: int) -> None:
+            job.progress = completed
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+
+        try:
+            result = function(report)
+        except JobCancelled:
+            with self._lock:
+                self._finish(job, "cancelled")
+        except Exception as error:  # surfaced to the client via the job status
+            with self._lock:
+                job.error = str(error)
+                self._finish(job, "failed")
+        else:
+            with self._lock:
+                if job.cancel_requested.is_set():
+                    self._finish(job, "cancelled")
+                    return
+                job.result = result.dict()
+                job.progress = job.total
+                self._finish(job, "succeeded")
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager(
+    max_workers=int(os.environ.get("JOB_WORKERS", "2")),
+    max_queued=int(os.environ.get("JOB_QUEUE_SIZE", "32")),
+    retention_seconds=float(os.environ.get("JOB_RETENTION_SECONDS", "900")),
+)
@@ -1,19 +1,77 @@
 """FastAPI application setup for the portfolio simulator service."""
 
-from fastapi import FastAPI
+from dataclasses import asdict
+import json
+from typing import Any, Callable, Literal, Optional, TypeVar, Union
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
-from backend.finance.simulate import run_monte_carlo, simulate_portfolio
+from backend.cache import request_key, result_cache
+# The finance modules import each other as ``finance.*``; importing them the same
+# way keeps one copy of each module, and so one property memo.
+from finance.amortization import iter_amortization_schedule
+from finance.correlated import run_correlated_monte_carlo
+from finance.grid import simulate_grid
+from finance.incremental import UnknownPortfolioKey, apply_portfolio_delta
+from finance.parallel import run_monte_carlo_sharded
+from finance.simulate import (
+    run_monte_carlo,
+    simulate_portfolio,
+    simulate_portfolio_columnar,
+    stream_monte_carlo,
+)
+from finance.solver import solve_goal
+from backend.jobs import Job, JobFunction, JobQueueFull, job_manager
+from backend.metrics import (
+    InstrumentedRoute,
+    TimedJSONResponse,
+    observe_request_sizes,
+    record_stage,
+    render_metrics,
+)
+from backend.registry import InvalidPortfolio, portfolio_registry
 from backend.schemas import (
+    AmortizationRequest,
+    ColumnarPortfolioResponse,
+    GoalSeekRequest,
+    GoalSeekResponse,
+    CorrelatedMonteCarloRequest,
+    CorrelatedMonteCarloResponse,
+    JobRequest,
+    JobStatus,
     MonteCarloRequest,
     MonteCarloResponse,
+    MonteCarloSummaryResponse,
+    PortfolioDeltaRequest,
+    PortfolioDeltaResponse,
+    PortfolioInfo,
     PortfolioResponse,
     PortfolioSimulationRequest,
+    PortfolioSource,
     SamplePortfolioResponse,
+    SensitivityGridRequest,
+    SensitivityGridResponse,
+    ShardedMonteCarloRequest,
 )
 
+# Iterations between progress updates (and cancellation checks) for jobs
+JOB_PROGRESS_CHUNK = 1000
+
+SourceT = TypeVar("SourceT", bound=PortfolioSource)
+
 # Instantiate FastAPI application
-app = FastAPI(title="Portfolio Simulator", version="1.0.0")
+app = FastAPI(
+    title="Portfolio Simulator",
+    version="1.0.0",
+    default_response_class=TimedJSONResponse,
+)
+# Time validation, compute and encoding separately for every route below
+app.router.route_class = InstrumentedRoute
 
 # Configure CORS middleware for local development and Vercel deployments
 app.add_middleware(
@@ -29,6 +87,41 @@ app.add_middleware(
 )
 
 
+def cached_response(
+    namespace: str,
+    request: BaseModel,
+    compute: Callable[[], Any],
+    exclude: Optional[set[str]] = None,
+) -> Response:
+    """Serve encoded results from the cache, computing and storing them on a miss."""
+    key = request_key(namespace, request, exclude)
+    body = result_cache.get(key)
+    if body is None:
+        body = encode_result(compute())
+        result_cache.set(key, body)
+    return Response(content=body, media_type="application/json")
+
+
+def encode_result(result: Any) -> bytes:
+    """Render a result to JSON without re-validating it against the response model."""
+    with record_stage("encode"):
+        if isinstance(result, BaseModel):
+            return result.json().encode()
+        return json.dumps(result).encode()
+
+
+def with_portfolio(request: SourceT) -> SourceT:
+    """Fill in ``properties`` from the registry when a ``portfolio_id`` is given."""
+    if request.portfolio_id is not None:
+        try:
+            portfolio = portfolio_registry.get(request.portfolio_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Unknown portfolio")
+        request = request.copy(update={"properties": portfolio.properties})
+    observe_request_sizes(request)
+    return request
+
+
 # Health monitoring endpoint
 @app.get("/health")
 def health_check() -> dict[str, str]:
@@ -45,13 +138,286 @@ def get_sample_properties() -> SamplePortfolioResponse:
 
 # Deterministic portfolio simulation endpoint
 @app.post("/simulate", response_model=PortfolioResponse)
-def simulate(request: PortfolioSimulationRequest) -> PortfolioResponse:
+def simulate(request: PortfolioSimulationRequest) -> Response:
     """Calculate deterministic portfolio metrics for the supplied properties."""
-    return simulate_portfolio(request)
+    # Cache keys use the portfolio id, so registered portfolios are never re-hashed.
+    resolved = with_portfolio(request)
+    return cached_response("simulate", request, lambda: simulate_portfolio(resolved))
+
+
+# Columnar deterministic simulation endpoint for large portfolios
+@app.post("/simulate/columnar", response_model=ColumnarPortfolioResponse)
+def simulate_columnar(request: PortfolioSimulationRequest) -> Response:
+    """Return portfolio metrics as arrays indexed by property and year."""
+    # Returning the response directly skips per-object response-model validation.
+    resolved = with_portfolio(request)
+    return cached_response(
+        "simulate/columnar", request, lambda: simulate_portfolio_columnar(resolved)
+    )
+
+
+# Sensitivity grid endpoint for batched rate sweeps
+@app.post("/simulate/grid", response_model=SensitivityGridResponse)
+def simulate_sensitivity_grid(request: SensitivityGridRequest) -> Response:
+    """Evaluate portfolio totals for every appreciation, rent growth and horizon."""
+    resolved = with_portfolio(request)
+    try:
+        return cached_response(
+            "simulate/grid", request, lambda: simulate_grid(resolved)
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+
+# Goal-seek endpoint for solving a property field against a target metric
+@app.post("/simulate/solve", response_model=GoalSeekResponse)
+def simulate_solve(request: GoalSeekRequest) -> Response:
+    """Find the field value that hits each target, for many properties at once."""
+    resolved = with_portfolio(request)
+    return cached_response("simulate/solve", request, lambda: solve_goal(resolved))
+
+
+# Incremental what-if endpoint for single-property edits
+@app.post("/simulate/delta", response_model=PortfolioDeltaResponse)
+def simulate_delta(request: PortfolioDeltaRequest) -> PortfolioDeltaResponse:
+    """Update a working portfolio's totals by recomputing only edited properties."""
+    if request.base is not None:
+        request = request.copy(update={"base": with_portfolio(request.base)})
+    try:
+        return apply_portfolio_delta(request)
+    except UnknownPortfolioKey:
+        raise HTTPException(status_code=404, detail="Unknown portfolio key")
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
 
 
 # Monte Carlo simulation endpoint
 @app.post("/monte-carlo", response_model=MonteCarloResponse)
-def monte_carlo(request: MonteCarloRequest) -> MonteCarloResponse:
+def monte_carlo(request: MonteCarloRequest) -> Union[MonteCarloResponse, Response]:
     """Run Monte Carlo simulations to summarize portfolio outcome distributions."""
-    return run_monte_carlo(request)
+    # Unseeded runs are meant to differ between calls, so only seeded ones are cached.
+    resolved = with_portfolio(request)
+    if request.seed is None:
+        body = encode_result(run_monte_carlo(resolved))
+        return Response(content=body, media_type="application/json")
+    return cached_response("monte-carlo", request, lambda: run_monte_carlo(resolved))
+
+
+# Streaming Monte Carlo endpoint for progressive rendering
+@app.post("/monte-carlo/stream")
+def monte_carlo_stream(
+    request: MonteCarloRequest,
+    format: Literal["ndjson", "sse"] = "ndjson",
+    chunk_size: int = Query(default=100, gt=0, le=10_000),
+) -> StreamingResponse:
+    """Stream Monte Carlo runs in chunks, followed by the final summary."""
+    messages = stream_monte_carlo(with_portfolio(request), chunk_size)
+    if format == "sse":
+        return StreamingResponse(
+            (
+                f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
+                for message in messages
+            ),
+            media_type="text/event-stream",
+        )
+    return StreamingResponse(
+        (json.dumps(message) + "\n" for message in messages),
+        media_type="application/x-ndjson",
+    )
+
+
+# Multi-process Monte Carlo endpoint for large, seeded iteration counts
+@app.post("/monte-carlo/sharded", response_model=MonteCarloSummaryResponse)
+def monte_carlo_sharded(
+    request: ShardedMonteCarloRequest,
+) -> Response:
+    """Split a seeded Monte Carlo run across worker processes and merge the shards."""
+    # The worker count never changes results, so it is left out of the cache key.
+    resolved = with_portfolio(request)
+    return cached_response(
+        "monte-carlo/sharded",
+        request,
+        lambda: run_monte_carlo_sharded(resolved),
+        exclude={"workers"},
+    )
+
+
+# Correlated per-property Monte Carlo endpoint for regional concentration risk
+@app.post("/monte-carlo/correlated", response_model=CorrelatedMonteCarloResponse)
+def monte_carlo_correlated(
+    request: CorrelatedMonteCarloRequest,
+) -> Union[CorrelatedMonteCarloResponse, Response]:
+    """Simulate yearly shocks per property, correlated by market, and summarize."""
+    resolved = with_portfolio(request)
+    try:
+        if request.seed is None:
+            return run_correlated_monte_carlo(resolved)
+        return cached_response(
+            "monte-carlo/correlated",
+            request,
+            lambda: run_correlated_monte_carlo(resolved),
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+
+# Result cache statistics endpoint
+@app.get("/cache/stats")
+def cache_stats() -> dict[str, int]:
+    """Report result cache hit, miss, eviction and expiration counters."""
+    return result_cache.stats()
+
+
+# Prometheus metrics endpoint for per-stage latency and request sizes
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Expose request latency and size histograms in Prometheus text format."""
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
+def bind_job(request: JobRequest) -> tuple[int, JobFunction]:
+    """Validate a job payload and bind it to the matching simulation."""
+    if request.kind == "simulate":
+        payload = with_portfolio(PortfolioSimulationRequest.parse_obj(request.payload))
+        return 1, lambda progress: simulate_portfolio(payload)
+    if request.kind == "monte-carlo":
+        payload = with_portfolio(MonteCarloRequest.parse_obj(request.payload))
+        return payload.iterations, lambda progress: run_monte_carlo(
+            payload, progress, chunk_size=JOB_PROGRESS_CHUNK
+        )
+    if request.kind == "monte-carlo/correlated":
+        payload = with_portfolio(
+            CorrelatedMonteCarloRequest.parse_obj(request.payload)
+        )
+        return payload.iterations, lambda progress: run_correlated_monte_carlo(
+            payload, progress
+        )
+    payload = with_portfolio(ShardedMonteCarloRequest.parse_obj(request.payload))
+    return payload.iterations, lambda progress: run_monte_carlo_sharded(
+        payload, progress
+    )
+
+
+def job_status(job: Job) -> JobStatus:
+    expires_at = None
+    if job.finished_at is not None:
+        expires_at = job.finished_at + job_manager.retention_seconds
+    return JobStatus(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        progress=job.progress,
+        total=job.total,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        expires_at=expires_at,
+        error=job.error,
+        result=job.result,
+    )
+
+
+# Background job submission endpoint
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+def submit_job(request: JobRequest) -> JobStatus:
+    """Queue a simulation to run in the background and return its job handle."""
+    try:
+        total, function = bind_job(request)
+    except ValidationError as error:
+        raise HTTPException(status_code=422, detail=jsonable_encoder(error.errors()))
+
+    try:
+        job = job_manager.submit(request.kind, total, function)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Job queue is full")
+    return job_status(job)
+
+
+# Background job status endpoint
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str) -> JobStatus:
+    """Report a job's state, progress and, once finished, its result."""
+    try:
+        return job_status(job_manager.get(job_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+
+# Background job cancellation endpoint
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+def cancel_job(job_id: str) -> JobStatus:
+    """Cancel a queued or running job, or discard a finished one."""
+    try:
+        return job_status(job_manager.cancel(job_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown job")
+
+
+# Bulk portfolio upload endpoint
+@app.post("/portfolios", response_model=PortfolioInfo, status_code=201)
+async def upload_portfolio(
+    request: Request,
+    name: Optional[str] = None,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+) -> PortfolioInfo:
+    """Stream CSV or NDJSON properties into the registry, validating each row."""
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "json" in content_type else "csv"
+    builder = portfolio_registry.builder(format)
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(builder.feed, chunk)
+        builder.finish()
+    except InvalidPortfolio as error:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "invalid_rows": error.invalid_rows,
+                "errors": jsonable_encoder(error.errors),
+            },
+        )
+    portfolio = await run_in_threadpool(portfolio_registry.create, builder, name)
+    return PortfolioInfo(**portfolio.info())
+
+
+# Registered portfolio listing endpoint
+@app.get("/portfolios", response_model=list[PortfolioInfo])
+def list_portfolios() -> list[PortfolioInfo]:
+    """List registered portfolios with their size and markets."""
+    return [PortfolioInfo(**info) for info in portfolio_registry.list_info()]
+
+
+# Registered portfolio lookup endpoint
+@app.get("/portfolios/{portfolio_id}", response_model=PortfolioInfo)
+def get_portfolio(portfolio_id: str) -> PortfolioInfo:
+    """Describe one registered portfolio."""
+    try:
+        return PortfolioInfo(**portfolio_registry.get(portfolio_id).info())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown portfolio")
+
+
+# Registered portfolio removal endpoint
+@app.delete("/portfolios/{portfolio_id}", response_model=PortfolioInfo)
+def delete_portfolio(portfolio_id: str) -> PortfolioInfo:
+    """Remove a registered portfolio."""
+    try:
+        return PortfolioInfo(**portfolio_registry.delete(portfolio_id).info())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown portfolio")
+
+
+# Monthly amortization schedule endpoint
+@app.post("/amortization")
+def amortization(request: AmortizationRequest) -> StreamingResponse:
+    """Stream the full monthly mortgage schedule as newline-delimited JSON rows."""
+    schedule = iter_amortization_schedule(
+        request.principal, request.mortgage_rate, request.mortgage_years
+    )
+    return StreamingResponse(
+        (json.dumps(asdict(entry)) + "\n" for entry in schedule),
+        media_type="application/x-ndjson",
+    )
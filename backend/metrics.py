@@ -0,0 +1,351 @@
+"""Per-stage request timing, Prometheus exposition and slow-request profiling."""
+
+from __future__ import annotations
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import inspect
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+import uuid
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from backend.schemas import PortfolioSource
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10_000, 100_000, 1_000_000)
+STAGES = ("validation", "compute", "response_validation", "encode")
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values, Prometheus style."""
+
+    def __init__(
+        self, name: str, help_text: str, labels: tuple[str, ...], buckets: tuple
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            counts, total = self._series.setdefault(
+                label_values, [[0] * (len(self.buckets) + 1), 0.0]
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            self._series[label_values][1] = total + value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {
+                key: (list(counts), total)
+                for key, (counts, total) in self._series.items()
+            }
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = ",".join(
+                f'{label}="{value}"' for label, value in zip(self.labels, label_values)
+            )
+            separator = "," if labels else ""
+            for bound, count in zip(self.buckets, counts):
+                yield f'{self.name}_bucket{{{labels}{separator}le="{bound}"}} {count}'
+            yield f'{self.name}_bucket{{{labels}{separator}le="+Inf"}} {counts[-1]}'
+            yield f"{self.name}_sum{{{labels}}} {total}"
+            yield f"{self.name}_count{{{labels}}} {counts[-1]}"
+
+
+REQUEST_SECONDS = Histogram(
+    "portfolio_request_seconds",
+    "Total handler time per endpoint.",
+    ("endpoint",),
+    LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "portfolio_request_stage_seconds",
+    "Handler time per endpoint and stage.",
+    ("endpoint", "stage"),
+    LATENCY_BUCKETS,
+)
+REQUEST_SIZES = {
+    field: Histogram(
+        f"portfolio_request_{field}",
+        f"Requested {field} per simulation request.",
+        ("endpoint",),
+        SIZE_BUCKETS,
+    )
+    for field in ("properties", "years", "iterations")
+}
+
+
+def render_metrics() -> str:
+    histograms = [REQUEST_SECONDS, STAGE_SECONDS, *REQUEST_SIZES.values()]
+    lines = [line for histogram in histograms for line in histogram.render()]
+    return "\n".join(lines) + "\n"
+
+
+class StackSampler(threading.Thread):
+    """Collect folded stacks of one thread at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def dump(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+        )
+
+
+# Opt-in: set PROFILE_SLOW_REQUESTS_MS to dump folded stacks of slower requests.
+PROFILE_THRESHOLD_MS = float(os.environ.get("PROFILE_SLOW_REQUESTS_MS", "0"))
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", "profiles"))
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+
+
+class StageTimings:
+    """Stage durations and endpoint boundaries for one request."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.stages: dict[str, float] = {}
+        self.endpoint_start: Optional[float] = None
+        self.endpoint_end: Optional[float] = None
+        self.encode_in_endpoint = 0.0
+        # Wall time spent producing a streamed body after the endpoint returned.
+        self.stream_seconds = 0.0
+        self.sampler: Optional[StackSampler] = None
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def breakdown(self, started: float, finished: float) -> dict[str, float]:
+        """Split a handler run that spanned ``started``..``finished`` into stages."""
+        stages = {stage: 0.0 for stage in STAGES}
+        stages.update(self.stages)
+        if self.endpoint_start is None or self.endpoint_end is None:
+            stages["validation"] = finished - started
+            return stages
+        stages["validation"] = self.endpoint_start - started
+        # Whatever follows the endpoint and is not JSON rendering is FastAPI's
+        # response-model validation and serialization.
+        encode_after = self.stages.get("encode", 0.0) - self.encode_in_endpoint
+        stages["response_validation"] = max(
+            finished - self.endpoint_end - encode_after - self.stream_seconds, 0.0
+        )
+        return stages
+
+
+_timings: ContextVar[Optional[StageTimings]] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def record_stage(stage: str) -> Iterator[None]:
+    """Attribute the enclosed block to ``stage`` for the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _timings.get()
+        if timings is not None:
+            timings.add(stage, time.perf_counter() - start)
+
+
+class TimedJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with record_stage("encode"):
+            return super().render(content)
+
+
+def observe_request_sizes(request: BaseModel) -> None:
+    """Record a portfolio request's sizes once its ``portfolio_id`` is resolved."""
+    timings = _timings.get()
+    if timings is not None:
+        _observe_sizes(timings.path, request)
+
+
+def _observe_sizes(endpoint: str, request: BaseModel) -> None:
+    for field, histogram in REQUEST_SIZES.items():
+        size = getattr(request, field, None)
+        if isinstance(size, list):
+            size = len(size) if field == "properties" else max(size, default=0)
+        if isinstance(size, int):
+            histogram.observe(size, endpoint)
+
+
+def _observe_request_sizes(endpoint: str, arguments: dict[str, Any]) -> None:
+    for value in arguments.values():
+        # Portfolio requests report through observe_request_sizes instead, as
+        # their property count is unknown until a portfolio_id is resolved.
+        if isinstance(value, BaseModel) and not isinstance(value, PortfolioSource):
+            _observe_sizes(endpoint, value)
+
+
+def _timed_endpoint(path: str, endpoint: Callable) -> Callable:
+    """Wrap an endpoint so its run counts as compute, net of nested stages."""
+
+    def start(arguments: dict[str, Any]) -> Optional[StageTimings]:
+        _observe_request_sizes(path, arguments)
+        timings = _timings.get()
+        if timings is not None:
+            if PROFILE_THRESHOLD_MS > 0:
+                timings.sampler = StackSampler(threading.get_ident(), PROFILE_INTERVAL)
+                timings.sampler.start()
+            timings.endpoint_start = time.perf_counter()
+        return timings
+
+    def finish(timings: Optional[StageTimings]) -> None:
+        if timings is None:
+            return
+        timings.endpoint_end = time.perf_counter()
+        if timings.sampler is not None:
+            timings.sampler.stop()
+        encode = timings.stages.get("encode", 0.0)
+        timings.encode_in_endpoint = encode
+        timings.add(
+            "compute", timings.endpoint_end - timings.endpoint_start - encode
+        )
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(**arguments: Any) -> Any:
+            timings = start(arguments)
+            try:
+                return await endpoint(**arguments)
+            finally:
+                finish(timings)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(**arguments: Any) -> Any:
+        timings = start(arguments)
+        try:
+            return endpoint(**arguments)
+        finally:
+            finish(timings)
+
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """Route that times each request stage and reports it as metrics and headers.
+
+    Stages: ``validation`` (body parsing and request model validation, up to
+    the endpoint call), ``compute`` (the endpoint itself), ``encode`` (JSON
+    rendering) and ``response_validation`` (everything else after the
+    endpoint returns, mostly response-model validation and serialization).
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, _timed_endpoint(path, endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def instrumented_handler(request: Request) -> Response:
+            timings = StageTimings(self.path)
+            token = _timings.set(timings)
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+            except BaseException:
+                self._record(timings, started, time.perf_counter(), None)
+                raise
+            finally:
+                _timings.reset(token)
+            if isinstance(response, StreamingResponse):
+                # Streamed bodies are computed after this handler returns.
+                response.body_iterator = self._timed_stream(
+                    response.body_iterator, timings, started
+                )
+            else:
+                self._record(timings, started, time.perf_counter(), response)
+            return response
+
+        return instrumented_handler
+
+    async def _timed_stream(
+        self, body: AsyncIterator, timings: StageTimings, started: float
+    ) -> AsyncIterator:
+        """Count producing each chunk as compute; record once the stream ends."""
+        stream_start = time.perf_counter()
+        try:
+            while True:
+                chunk_start = time.perf_counter()
+                try:
+                    chunk = await body.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    timings.add("compute", time.perf_counter() - chunk_start)
+                yield chunk
+        finally:
+            finished = time.perf_counter()
+            timings.stream_seconds = finished - stream_start
+            # Headers left with the first chunk, so streams report to /metrics only.
+            self._record(timings, started, finished, None)
+
+    def _record(
+        self,
+        timings: StageTimings,
+        started: float,
+        finished: float,
+        response: Optional[Response],
+    ) -> None:
+        # Rejected requests are recorded too; they only lack the response header.
+        total = finished - started
+        stages = timings.breakdown(started, finished)
+        for stage in STAGES:
+            STAGE_SECONDS.observe(stages[stage], self.path, stage)
+        REQUEST_SECONDS.observe(total, self.path)
+        if response is not None:
+            response.headers["Server-Timing"] = ", ".join(
+                [f"{stage};dur={stages[stage] * 1000:.3f}" for stage in STAGES]
+                + [f"total;dur={total * 1000:.3f}"]
+            )
+
+        if timings.sampler is not None and total * 1000 >= PROFILE_THRESHOLD_MS:
+            slug = self.path.strip("/").replace("/", "_") or "root"
+            stamp = time.strftime("%Y%m%dT%H%M%S")
+            timings.sampler.dump(
+                PROFILE_DIR / f"{stamp}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+            )
@@ -0,0 +1,408 @@
+"""SQLite-backed registry of uploaded portfolios stored as columns."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import csv
+from dataclasses import dataclass, field
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, Optional
+import uuid
+import zlib
+
+import numpy as np
+from pydantic import ValidationError
+
+from backend.schemas import Property
+
+NUMERIC_COLUMNS = (
+    "purchase_price",
+    "down_payment",
+    "mortgage_rate",
+    "mortgage_years",
+    "annual_rent",
+    "annual_expenses",
+)
+REQUIRED_COLUMNS = ("name", *NUMERIC_COLUMNS)
+# Row errors returned when an upload is rejected; the rest are only counted.
+MAX_REPORTED_ROW_ERRORS = 100
+# Longest accepted row, including quoted line breaks.
+MAX_ROW_BYTES = 64 * 1024
+
+
+class InvalidPortfolio(Exception):
+    """Raised when an upload has malformed or invalid rows."""
+
+    def __init__(self, errors: list[dict[str, Any]], invalid_rows: int):
+        super().__init__(f"{invalid_rows} invalid rows")
+        self.errors = errors
+        self.invalid_rows = invalid_rows
+
+
+class PortfolioBuilder:
+    """Validate uploaded rows one at a time into column buffers.
+
+    Bytes may arrive in arbitrary chunks. Each complete row is parsed as a
+    CSV record (after a header row) or an NDJSON object and validated as a
+    ``Property``. A CSV row ends at the first line break outside quotes, so
+    quoted fields may span lines. Only the columns are kept, never the
+    parsed rows.
+    """
+
+    def __init__(self, format: str, max_properties: int):
+        self.format = format
+        self.max_properties = max_properties
+        self.names: list[str] = []
+        self.markets: list[Optional[str]] = []
+        self.columns: list[list[float]] = [[] for _ in NUMERIC_COLUMNS]
+        self.errors: list[dict[str, Any]] = []
+        self.invalid_rows = 0
+        self._seen: set[str] = set()
+        self._header: Optional[list[str]] = None
+        self._buffer = b""
+        # Lines of a CSV row whose quoted field is still open.
+        self._open_row: list[bytes] = []
+        self._open_row_bytes = 0
+        self._open_row_quotes = 0
+        self._line = 0
+
+    def feed(self, chunk: bytes) -> None:
+        lines = (self._buffer + chunk).split(b"\n")
+        self._buffer = lines.pop()
+        for line in lines:
+            self._add_line(line)
+        self._check_row_size(len(self._buffer))
+
+    def finish(self) -> None:
+        """Parse any trailing line and raise ``InvalidPortfolio`` on errors."""
+        if self._buffer:
+            self._add_line(self._buffer)
+            self._buffer = b""
+        if self._open_row:
+            self._line += 1
+            self._open_row = []
+            self._reject({"row": self._line, "errors": ["unterminated quoted field"]})
+        if self.format == "csv" and self._header is None:
+            self._reject({"row": 0, "errors": ["missing CSV header"]})
+        if not self.names and not self.invalid_rows:
+            self._reject({"row": 0, "errors": ["no properties uploaded"]})
+        if self.invalid_rows:
+            raise InvalidPortfolio(self.errors, self.invalid_rows)
+
+    def _add_line(self, raw: bytes) -> None:
+        if self.format == "csv":
+            self._open_row.append(raw)
+            self._open_row_bytes += len(raw) + 1
+            self._open_row_quotes += raw.count(b'"')
+            self._check_row_size(0)
+            # Quotes come in pairs ("" escapes one), so an odd count means a
+            # quoted field continues on the next line.
+            if self._open_row_quotes % 2:
+                return
+            raw = b"\n".join(self._open_row)
+            self._open_row = []
+            self._open_row_bytes = 0
+            self._open_row_quotes = 0
+        self._line += 1
+        try:
+            line = raw.decode("utf-8-sig" if self._line == 1 else "utf-8")
+        except UnicodeDecodeError:
+            self._reject({"row": self._line, "errors": ["line is not valid UTF-8"]})
+            return
+        if not line.strip():
+            return
+        if self.format == "csv":
+            record = self._csv_record(line)
+        else:
+            record = self._ndjson_record(line)
+        if record is not None:
+            self._add_record(record)
+
+    def _csv_record(self, line: str) -> Optional[dict[str, Any]]:
+        values = next(csv.reader([line]))
+        if self._header is None:
+            self._header = [column.strip() for column in values]
+            missing = [name for name in REQUIRED_COLUMNS if name not in self._header]
+            if missing:
+                # Every row would fail the same way; report the header once.
+                raise InvalidPortfolio(
+                    [{"row": self._line, "errors": [f"missing columns: {missing}"]}],
+                    1,
+                )
+            return None
+        if len(values) != len(self._header):
+            self._reject(
+                {
+                    "row": self._line,
+                    "errors": [f"expected {len(self._header)} fields"],
+                }
+            )
+            return None
+        record = dict(zip(self._header, values))
+        if not record.get("market"):
+            record["market"] = None
+        return record
+
+    def _ndjson_record(self, line: str) -> Optional[dict[str, Any]]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            self._reject({"row": self._line, "errors": [f"invalid JSON: {error}"]})
+            return None
+        if not isinstance(record, dict):
+            self._reject({"row": self._line, "errors": ["expected a JSON object"]})
+            return None
+        return record
+
+    def _add_record(self, record: dict[str, Any]) -> None:
+        try:
+            prop = Property.parse_obj(record)
+        except ValidationError as error:
+            self._reject({"row": self._line, "errors": error.errors()})
+            return
+        if prop.name in self._seen:
+            self._reject(
+                {"row": self._line, "errors": [f"duplicate name: {prop.name}"]}
+            )
+            return
+        if len(self.names) >= self.max_properties:
+            self._reject(
+                {
+                    "row": self._line,
+                    "errors": [f"more than {self.max_properties} properties"],
+                }
+            )
+            return
+        self._seen.add(prop.name)
+        self.names.append(prop.name)
+        self.markets.append(prop.market)
+        for column, name in zip(self.columns, NUMERIC_COLUMNS):
+            column.append(getattr(prop, name))
+
+    def _check_row_size(self, pending: int) -> None:
+        if self._open_row_bytes + pending > MAX_ROW_BYTES:
+            # The row cannot be skipped without reading it, so stop here.
+            self._reject(
+                {
+                    "row": self._line + 1,
+                    "errors": [f"row longer than {MAX_ROW_BYTES} bytes"],
+                }
+            )
+            raise InvalidPortfolio(self.errors, self.invalid_rows)
+
+    def _reject(self, error: dict[str, Any]) -> None:
+        self.invalid_rows += 1
+        if len(self.errors) < MAX_REPORTED_ROW_ERRORS:
+            self.errors.append(error)
+
+
+@dataclass
+class StoredPortfolio:
+    id: str
+    name: Optional[str]
+    created_at: float
+    names: list[str]
+    markets: list[Optional[str]]
+    # Shaped (len(NUMERIC_COLUMNS), properties).
+    columns: np.ndarray
+    _properties: Optional[list[Property]] = field(default=None, repr=False)
+
+    @property
+    def properties(self) -> list[Property]:
+        """Rows rebuilt without re-validation; built once, treat as read-only."""
+        if self._properties is None:
+            rows = zip(self.names, self.markets, self.columns.T.tolist())
+            self._properties = []
+            for name, market, values in rows:
+                fields = dict(zip(NUMERIC_COLUMNS, values))
+                fields["mortgage_years"] = int(fields["mortgage_years"])
+                self._properties.append(
+                    Property.construct(name=name, market=market, **fields)
+                )
+        return self._properties
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "properties": len(self.names),
+            "markets": sorted({market for market in self.markets if market}),
+            "created_at": self.created_at,
+        }
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared across threads."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._slots:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._connect()
+            try:
+                yield connection
+            finally:
+                with self._lock:
+                    self._idle.append(connection)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+
+class PortfolioRegistry:
+    """Uploaded portfolios, one compressed row of columns each.
+
+    Decoded portfolios are kept in a small LRU, so repeat simulations of the
+    same ``portfolio_id`` skip SQLite as well as parsing and validation.
+    Portfolios are immutable; uploading again creates a new id.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = 4,
+        max_cached: int = 32,
+        max_properties: int = 100_000,
+    ):
+        self.max_cached = max_cached
+        self.max_properties = max_properties
+        self._pool = ConnectionPool(path, pool_size)
+        self._cached: OrderedDict[str, StoredPortfolio] = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def builder(self, format: str) -> PortfolioBuilder:
+        return PortfolioBuilder(format, self.max_properties)
+
+    def create(self, builder: PortfolioBuilder, name: Optional[str]) -> StoredPortfolio:
+        portfolio = StoredPortfolio(
+            id=uuid.uuid4().hex,
+            name=name,
+            created_at=time.time(),
+            names=builder.names,
+            markets=builder.markets,
+            columns=np.array(builder.columns, dtype=float),
+        )
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO portfolios "
+                "(id, name, created_at, count, markets, labels, columns) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    portfolio.id,
+                    portfolio.name,
+                    portfolio.created_at,
+                    len(portfolio.names),
+                    json.dumps(portfolio.info()["markets"]),
+                    zlib.compress(
+                        json.dumps([portfolio.names, portfolio.markets]).encode()
+                    ),
+                    zlib.compress(portfolio.columns.tobytes()),
+                ),
+            )
+            connection.commit()
+        self._remember(portfolio)
+        return portfolio
+
+    def get(self, portfolio_id: str) -> StoredPortfolio:
+        """Load a portfolio, raising ``KeyError`` for an unknown id."""
+        with self._lock:
+            portfolio = self._cached.get(portfolio_id)
+            if portfolio is not None:
+                self._cached.move_to_end(portfolio_id)
+                return portfolio
+
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT name, created_at, count, labels, columns FROM portfolios "
+                "WHERE id = ?",
+                (portfolio_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(portfolio_id)
+        name, created_at, count, labels, columns = row
+        names, markets = json.loads(zlib.decompress(labels))
+        portfolio = StoredPortfolio(
+            id=portfolio_id,
+            name=name,
+            created_at=created_at,
+            names=names,
+            markets=markets,
+            columns=np.frombuffer(zlib.decompress(columns), dtype=float).reshape(
+                len(NUMERIC_COLUMNS), count
+            ),
+        )
+        self._remember(portfolio)
+        return portfolio
+
+    def list_info(self) -> list[dict[str, Any]]:
+        """Describe every portfolio without decoding its columns."""
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT id, name, count, markets, created_at FROM portfolios "
+                "ORDER BY created_at"
+            ).fetchall()
+        return [
+            {
+                "id": portfolio_id,
+                "name": name,
+                "properties": count,
+                "markets": json.loads(markets),
+                "created_at": created_at,
+            }
+            for portfolio_id, name, count, markets, created_at in rows
+        ]
+
+    def delete(self, portfolio_id: str) -> StoredPortfolio:
+        portfolio = self.get(portfolio_id)
+        with self._connection() as connection:
+            connection.execute("DELETE FROM portfolios WHERE id = ?", (portfolio_id,))
+            connection.commit()
+        with self._lock:
+            self._cached.pop(portfolio_id, None)
+        return portfolio
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        with self._pool.connection() as connection:
+            if not self._schema_ready:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS portfolios ("
+                    "id TEXT PRIMARY KEY, name TEXT, created_at REAL NOT NULL, "
+                    "count INTEGER NOT NULL, markets TEXT NOT NULL, "
+                    "labels BLOB NOT NULL, columns BLOB NOT NULL)"
+                )
+                connection.commit()
+                self._schema_ready = True
+            yield connection
+
+    def _remember(self, portfolio: StoredPortfolio) -> None:
+        with self._lock:
+            self._cached[portfolio.id] = portfolio
+            self._cached.move_to_end(portfolio.id)
+            while len(self._cached) > self.max_cached:
+                self._cached.popitem(last=False)
+
+
+portfolio_registry = PortfolioRegistry(
+    path=os.environ.get("PORTFOLIO_DB_PATH", "portfolios.db"),
+    pool_size=int(os.environ.get("PORTFOLIO_DB_POOL_SIZE", "4")),
+    max_cached=int(os.environ.get("PORTFOLIO_CACHE_SIZE", "32")),
+    max_properties=int(os.environ.get("PORTFOLIO_MAX_PROPERTIES", "100000")),
+)
@@ -1,8 +1,37 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, conint, root_validator
+
+# Largest Monte Carlo run that may return every individual run.
+MAX_RETURNED_RUNS = 1000
+# Largest appreciation x rent growth grid evaluated in one request.
+MAX_GRID_CELLS = 10_000
+# Largest rate combinations x properties x years evaluated by one grid request.
+MAX_GRID_PATH_CELLS = 50_000_000
+
+SamplingStrategy = Literal["random", "antithetic", "latin_hypercube", "sobol"]
+# Largest iterations x properties x years evaluated by one correlated request.
+MAX_CORRELATED_CELLS = 100_000_000
+# Market assigned to properties that do not name one.
+DEFAULT_MARKET = "default"
+# Largest number of target values solved for in one goal-seek request.
+MAX_SOLVER_TARGETS = 100
+
+# PropertyMetrics fields, plus the PortfolioResponse.totals names.
+SolverMetric = Literal[
+    "value",
+    "annual_cashflow",
+    "total_cashflow",
+    "total_investment",
+    "equity",
+    "cashflow",
+    "investment",
+]
+SolverField = Literal[
+    "purchase_price", "down_payment", "mortgage_rate", "annual_rent", "annual_expenses"
+]
 
 
 class Property(BaseModel):
@@ -13,15 +42,66 @@ class Property(BaseModel):
     mortgage_years: int = Field(gt=0)
     annual_rent: float = Field(ge=0)
     annual_expenses: float = Field(ge=0)
+    # Market or region; shocks are correlated within and across markets.
+    market: Optional[str] = None
 
 
-class PortfolioSimulationRequest(BaseModel):
-    properties: List[Property]
+class PortfolioSource(BaseModel):
+    """Properties given inline or as the id of a registered portfolio."""
+
+    properties: Optional[List[Property]] = None
+    portfolio_id: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_source(cls, values):
+        if (values["properties"] is None) == (values["portfolio_id"] is None):
+            raise ValueError("provide exactly one of properties or portfolio_id")
+        return values
+
+
+class PortfolioSimulationRequest(PortfolioSource):
     years: int = Field(gt=0, le=40)
     appreciation_rate: float = Field(default=0.03)
     rent_growth_rate: float = Field(default=0.02)
 
 
+class GoalSeekRequest(PortfolioSimulationRequest):
+    metric: SolverMetric
+    solve_for: SolverField
+    targets: List[float] = Field(min_items=1, max_items=MAX_SOLVER_TARGETS)
+    lower: float = Field(ge=0)
+    upper: float
+    # "property" solves each property on its own; "portfolio" finds one value
+    # of ``solve_for``, applied to every property, for the summed metric.
+    scope: Literal["property", "portfolio"] = "property"
+    max_iterations: int = Field(default=50, gt=0, le=200)
+    # Largest accepted |metric - target|, in the metric's units.
+    tolerance: float = Field(default=0.01, gt=0)
+
+    @root_validator(skip_on_failure=True)
+    def check_bounds(cls, values):
+        if values["upper"] <= values["lower"]:
+            raise ValueError("upper must be greater than lower")
+        if values["solve_for"] == "purchase_price" and values["lower"] <= 0:
+            raise ValueError("purchase_price bounds must be positive")
+        return values
+
+
+class GoalSeekSolution(BaseModel):
+    name: Optional[str] = None
+    target: float
+    value: Optional[float] = None
+    status: Literal["converged", "not_bracketed", "not_converged"]
+    iterations: int
+    residual: Optional[float] = None
+
+
+class GoalSeekResponse(BaseModel):
+    metric: str
+    solve_for: str
+    solutions: List[GoalSeekSolution]
+
+
 class PropertyMetricsSchema(BaseModel):
     value: float
     annual_cashflow: float
@@ -48,14 +128,141 @@ class PortfolioResponse(BaseModel):
     yearly: List[YearlyPortfolioSnapshot]
 
 
-class MonteCarloRequest(BaseModel):
-    properties: List[Property]
+class PortfolioDeltaRequest(BaseModel):
+    base: Optional[PortfolioSimulationRequest] = None
+    base_key: Optional[str] = None
+    added: List[Property] = []
+    removed: List[str] = []
+    changed: List[Property] = []
+
+    @root_validator(skip_on_failure=True)
+    def check_base(cls, values):
+        if (values["base"] is None) == (values["base_key"] is None):
+            raise ValueError("provide exactly one of base or base_key")
+        return values
+
+
+class PortfolioDeltaResponse(BaseModel):
+    key: str
+    properties: List[PropertyBreakdown]
+    removed: List[str]
+    totals: Dict[str, float]
+    yearly: List[YearlyPortfolioSnapshot]
+
+
+def check_grid_cells(combinations: int, property_count: int, years: int) -> None:
+    if combinations * property_count * years > MAX_GRID_PATH_CELLS:
+        raise ValueError(
+            "rate combinations x properties x years must not exceed "
+            f"{MAX_GRID_PATH_CELLS}"
+        )
+
+
+class SensitivityGridRequest(PortfolioSource):
+    appreciation_rates: List[float] = Field(min_items=1)
+    rent_growth_rates: List[float] = Field(min_items=1)
+    years: List[conint(gt=0, le=40)] = Field(min_items=1, max_items=40)
+
+    @root_validator(skip_on_failure=True)
+    def check_grid_size(cls, values):
+        cells = len(values["appreciation_rates"]) * len(values["rent_growth_rates"])
+        if cells > MAX_GRID_CELLS:
+            raise ValueError(f"grid exceeds {MAX_GRID_CELLS} rate combinations")
+        # Registered portfolios are checked once their size is known.
+        if values["properties"] is not None:
+            check_grid_cells(cells, len(values["properties"]), max(values["years"]))
+        return values
+
+
+class SensitivityGridResponse(BaseModel):
+    appreciation_rates: List[float]
+    rent_growth_rates: List[float]
+    years: List[int]
+    # metric -> [appreciation index][rent growth index][years index]
+    totals: Dict[str, List[List[List[float]]]]
+
+
+class ColumnarPropertyMetrics(BaseModel):
+    name: List[str]
+    value: List[float]
+    annual_cashflow: List[float]
+    total_cashflow: List[float]
+    total_investment: List[float]
+    equity: List[float]
+    yearly_cashflows: List[List[float]]
+
+
+class ColumnarYearlySnapshots(BaseModel):
+    year: List[int]
+    annual_cashflow: List[float]
+    cumulative_cashflow: List[float]
+
+
+class ColumnarPortfolioResponse(BaseModel):
+    properties: ColumnarPropertyMetrics
+    totals: Dict[str, float]
+    yearly: ColumnarYearlySnapshots
+
+
+class MonteCarloRequest(PortfolioSource):
     years: int = Field(gt=0, le=40)
-    iterations: int = Field(gt=0, le=1000)
+    iterations: int = Field(gt=0, le=100_000)
     appreciation_rate: float = Field(default=0.03)
     appreciation_volatility: float = Field(default=0.01, ge=0)
     rent_growth_rate: float = Field(default=0.02)
     rent_growth_volatility: float = Field(default=0.01, ge=0)
+    seed: Optional[int] = Field(default=None, ge=0)
+    summary_only: bool = False
+    sampling: SamplingStrategy = "random"
+    # Stop once the confidence interval on mean cashflow and equity is this
+    # narrow (in currency units); ``iterations`` then caps the run.
+    target_precision: Optional[float] = Field(default=None, gt=0)
+    confidence_level: float = Field(default=0.95, gt=0, lt=1)
+
+    @root_validator(skip_on_failure=True)
+    def check_returned_runs(cls, values):
+        if not values["summary_only"] and values["iterations"] > MAX_RETURNED_RUNS:
+            raise ValueError(
+                f"iterations above {MAX_RETURNED_RUNS} require summary_only"
+            )
+        return values
+
+
+class ShardedMonteCarloRequest(MonteCarloRequest):
+    iterations: int = Field(gt=0, le=1_000_000)
+    seed: int = Field(ge=0)
+    workers: Optional[int] = Field(default=None, gt=0, le=64)
+    summary_only: bool = True
+
+
+def check_path_cells(iterations: int, property_count: int, years: int) -> None:
+    if iterations * property_count * years > MAX_CORRELATED_CELLS:
+        raise ValueError(
+            f"iterations x properties x years must not exceed {MAX_CORRELATED_CELLS}"
+        )
+
+
+class CorrelatedMonteCarloRequest(MonteCarloRequest):
+    # Every run draws a fresh path per property, so only summaries are returned.
+    summary_only: Literal[True] = True
+    # Only antithetic pairing extends to per-year, per-property shock paths.
+    sampling: Literal["random", "antithetic"] = "random"
+    market_correlation: float = Field(default=0.6, ge=0, le=1)
+    cross_market_correlation: float = Field(default=0.2, ge=-1, le=1)
+    # Overrides for specific market pairs, e.g. {"austin": {"dallas": 0.5}}.
+    market_correlations: Dict[str, Dict[str, float]] = {}
+    rent_appreciation_correlation: float = Field(default=0.3, ge=-1, le=1)
+    # Year-over-year autocorrelation of each property's shocks.
+    persistence: float = Field(default=0.0, ge=0, lt=1)
+
+    @root_validator(skip_on_failure=True)
+    def check_cells(cls, values):
+        # Registered portfolios are checked once their size is known.
+        if values["properties"] is not None:
+            check_path_cells(
+                values["iterations"], len(values["properties"]), values["years"]
+            )
+        return values
 
 
 class MonteCarloRun(BaseModel):
@@ -64,9 +271,79 @@ class MonteCarloRun(BaseModel):
     totals: Dict[str, float]
 
 
+class MonteCarloHistogram(BaseModel):
+    edges: List[float]
+    counts: List[int]
+
+
+class ConfidenceInterval(BaseModel):
+    low: float
+    high: float
+    std_error: float
+
+
 class MonteCarloResponse(BaseModel):
     runs: List[MonteCarloRun]
     summary: Dict[str, Dict[str, float]]
+    histograms: Dict[str, MonteCarloHistogram] = {}
+    iterations: int
+    intervals: Dict[str, Dict[str, ConfidenceInterval]] = {}
+    converged: Optional[bool] = None
+
+
+class MonteCarloSummaryResponse(BaseModel):
+    iterations: int
+    shards: int
+    seed: int
+    summary: Dict[str, Dict[str, float]]
+    histograms: Dict[str, MonteCarloHistogram] = {}
+    intervals: Dict[str, Dict[str, ConfidenceInterval]] = {}
+    converged: Optional[bool] = None
+
+
+class CorrelatedMonteCarloResponse(BaseModel):
+    iterations: int
+    summary: Dict[str, Dict[str, float]]
+    histograms: Dict[str, MonteCarloHistogram] = {}
+    intervals: Dict[str, Dict[str, ConfidenceInterval]] = {}
+    converged: Optional[bool] = None
+    # Per-market summaries of each market's share of the portfolio totals.
+    markets: Dict[str, Dict[str, Dict[str, float]]]
+
+
+class JobRequest(BaseModel):
+    kind: Literal[
+        "simulate", "monte-carlo", "monte-carlo/sharded", "monte-carlo/correlated"
+    ]
+    payload: Dict[str, Any]
+
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: int
+    total: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+
+class AmortizationRequest(BaseModel):
+    principal: float = Field(ge=0)
+    mortgage_rate: float = Field(ge=0)
+    mortgage_years: int = Field(gt=0)
+
+
+class PortfolioInfo(BaseModel):
+    id: str
+    name: Optional[str] = None
+    properties: int
+    markets: List[str]
+    created_at: float
 
 
 class SamplePortfolioResponse(BaseModel):
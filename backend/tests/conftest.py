@@ -0,0 +1,6 @@
+from pathlib import Path
+import sys
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+# The finance modules import ``models``/``schemas`` as top-level modules.
+sys.path[:0] = [str(BACKEND_DIR), str(BACKEND_DIR.parent)]
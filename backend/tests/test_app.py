@@ -0,0 +1,10 @@
+import sys
+
+
+def test_app_imports_finance_modules_once():
+    import backend.main  # noqa: F401
+    import finance.simulate
+
+    # A second copy under backend.finance would hold its own property memo.
+    assert not [name for name in sys.modules if name.startswith("backend.finance")]
+    assert "memoized_property_cashflow" in vars(finance.simulate)
@@ -0,0 +1,85 @@
+import numpy as np
+
+from finance import parallel
+from finance.parallel import run_monte_carlo_sharded
+from finance.simulate import property_cashflow
+from finance.vectorized import PropertyArrays, simulate_paths
+from schemas import Property, SamplePortfolioResponse, ShardedMonteCarloRequest
+
+# Largest relative difference accepted between the vectorized and scalar engines.
+RELATIVE_TOLERANCE = 1e-9
+
+
+def random_properties(rng: np.random.Generator, count: int) -> list[Property]:
+    prices = rng.uniform(50_000, 2_000_000, count)
+    return [
+        Property(
+            name=f"property-{index}",
+            purchase_price=price,
+            down_payment=price * rng.uniform(0, 1),
+            mortgage_rate=rng.choice([0.0, rng.uniform(0.001, 0.12)]),
+            mortgage_years=int(rng.integers(1, 41)),
+            annual_rent=price * rng.uniform(0, 0.15),
+            annual_expenses=price * rng.uniform(0, 0.05),
+        )
+        for index, price in enumerate(prices)
+    ]
+
+
+def test_vectorized_engine_matches_scalar_property_cashflow():
+    rng = np.random.default_rng(0)
+    properties = random_properties(rng, 500)
+    appreciation = rng.normal(0.03, 0.05, 4)
+    rent_growth = rng.normal(0.02, 0.05, 4)
+    years = 40
+
+    paths = simulate_paths(
+        PropertyArrays.from_properties(properties), years, appreciation, rent_growth
+    )
+    for run, (appreciation_rate, rent_growth_rate) in enumerate(
+        zip(appreciation, rent_growth)
+    ):
+        for index, prop in enumerate(properties):
+            expected = property_cashflow(
+                prop.purchase_price,
+                prop.down_payment,
+                prop.mortgage_rate,
+                prop.mortgage_years,
+                prop.annual_rent,
+                prop.annual_expenses,
+                appreciation_rate,
+                rent_growth_rate,
+                years,
+            )
+            scale = prop.purchase_price
+            actual = {
+                "value": paths.values[run, index, -1],
+                "equity": paths.equity[run, index, -1],
+                "total_investment": paths.investment[index],
+                "total_cashflow": paths.cashflows[run, index].sum(),
+            }
+            for field, value in actual.items():
+                assert abs(value - getattr(expected, field)) <= (
+                    RELATIVE_TOLERANCE * scale
+                ), (field, prop)
+            np.testing.assert_allclose(
+                paths.cashflows[run, index],
+                expected.yearly_cashflows,
+                rtol=0,
+                atol=RELATIVE_TOLERANCE * scale,
+            )
+
+
+def test_sharded_results_do_not_depend_on_worker_count(monkeypatch):
+    # Use the process pool even on single-CPU hosts.
+    monkeypatch.setattr(parallel, "SHARD_WORKERS", 4)
+    properties = SamplePortfolioResponse.example().properties
+    for options in ({}, {"sampling": "sobol", "target_precision": 50.0}):
+        request = ShardedMonteCarloRequest(
+            properties=properties, years=10, iterations=35_000, seed=7, **options
+        )
+        results = [
+            run_monte_carlo_sharded(request.copy(update={"workers": workers})).dict()
+            for workers in (1, 4)
+        ]
+        assert results[0] == results[1]
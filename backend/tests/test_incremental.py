@@ -0,0 +1,82 @@
+import pytest
+
+from finance.incremental import UnknownPortfolioKey, apply_portfolio_delta
+from finance.simulate import simulate_portfolio
+from schemas import (
+    PortfolioDeltaRequest,
+    PortfolioSimulationRequest,
+    Property,
+    SamplePortfolioResponse,
+)
+
+
+def sample_base() -> PortfolioSimulationRequest:
+    return PortfolioSimulationRequest(
+        properties=SamplePortfolioResponse.example().properties, years=10
+    )
+
+
+def renamed(prop: Property, name: str, **changes) -> Property:
+    return prop.copy(update={"name": name, **changes})
+
+
+def test_delta_totals_match_a_full_simulation():
+    base = sample_base()
+    duplex, house = base.properties
+    started = apply_portfolio_delta(PortfolioDeltaRequest(base=base))
+
+    edited = apply_portfolio_delta(
+        PortfolioDeltaRequest(
+            base_key=started.key,
+            removed=[duplex.name],
+            changed=[renamed(house, house.name, annual_rent=30_000)],
+            added=[renamed(duplex, "Condo", purchase_price=200_000)],
+        )
+    )
+    expected = simulate_portfolio(
+        base.copy(
+            update={
+                "properties": [
+                    renamed(house, house.name, annual_rent=30_000),
+                    renamed(duplex, "Condo", purchase_price=200_000),
+                ]
+            }
+        )
+    )
+
+    assert edited.key == started.key
+    assert [prop.name for prop in edited.properties] == [house.name, "Condo"]
+    assert edited.totals == pytest.approx(expected.totals)
+    assert [year.annual_cashflow for year in edited.yearly] == pytest.approx(
+        [year.annual_cashflow for year in expected.yearly]
+    )
+
+
+@pytest.mark.parametrize("edit", ["removed", "changed", "added"])
+def test_duplicate_edits_are_rejected_without_touching_the_state(edit):
+    base = sample_base()
+    duplex = base.properties[0]
+    started = apply_portfolio_delta(PortfolioDeltaRequest(base=base))
+    edits = {
+        "removed": [duplex.name, duplex.name],
+        "changed": [duplex, duplex],
+        "added": [renamed(duplex, "Condo"), renamed(duplex, "Condo")],
+    }
+
+    with pytest.raises(ValueError, match="duplicate"):
+        apply_portfolio_delta(
+            PortfolioDeltaRequest(base_key=started.key, **{edit: edits[edit]})
+        )
+    unchanged = apply_portfolio_delta(PortfolioDeltaRequest(base_key=started.key))
+    assert unchanged.totals == started.totals
+
+
+def test_unknown_edits_and_keys_are_reported_separately():
+    started = apply_portfolio_delta(PortfolioDeltaRequest(base=sample_base()))
+
+    with pytest.raises(ValueError, match="unknown property"):
+        apply_portfolio_delta(
+            PortfolioDeltaRequest(base_key=started.key, removed=["Missing"])
+        )
+    with pytest.raises(UnknownPortfolioKey):
+        apply_portfolio_delta(PortfolioDeltaRequest(base_key="missing"))
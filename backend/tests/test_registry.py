@@ -0,0 +1,61 @@
+import pytest
+
+from backend.registry import MAX_ROW_BYTES, InvalidPortfolio, PortfolioBuilder
+
+HEADER = (
+    b"name,purchase_price,down_payment,mortgage_rate,mortgage_years,"
+    b"annual_rent,annual_expenses\n"
+)
+
+
+def build(data: bytes, chunk_size: int) -> PortfolioBuilder:
+    builder = PortfolioBuilder("csv", max_properties=100)
+    for start in range(0, len(data), chunk_size):
+        builder.feed(data[start : start + chunk_size])
+    builder.finish()
+    return builder
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_quoted_fields_may_span_lines_in_any_chunking(chunk_size):
+    data = HEADER + (
+        b'"Duplex\nUnit ""A""",350000,70000,0.045,30,36000,9000\n'
+        b"House,280000,56000,0.042,30,28800,7200"
+    )
+    builder = build(data, chunk_size)
+
+    assert builder.names == ['Duplex\nUnit "A"', "House"]
+    assert builder.columns[0] == [350_000, 280_000]
+
+
+def test_row_numbers_count_records_not_lines():
+    data = HEADER + (
+        b'"Duplex\nUnit A",350000,70000,0.045,30,36000,9000\n'
+        b"House,-1,56000,0.042,30,28800,7200\n"
+    )
+    with pytest.raises(InvalidPortfolio) as raised:
+        build(data, 4096)
+
+    assert [error["row"] for error in raised.value.errors] == [3]
+
+
+def test_unterminated_quote_is_rejected():
+    data = HEADER + b'"Duplex,350000,70000,0.045,30,36000,9000\n'
+    with pytest.raises(InvalidPortfolio) as raised:
+        build(data, 4096)
+
+    assert raised.value.errors[-1]["errors"] == ["unterminated quoted field"]
+
+
+@pytest.mark.parametrize("line_break", [b"", b"\n"])
+def test_rows_longer_than_the_limit_stop_the_upload(line_break):
+    # With an open quote, later lines belong to the same row.
+    data = HEADER + b'"' + (b"x" * 1000 + line_break) * (MAX_ROW_BYTES // 1000 + 1)
+    builder = PortfolioBuilder("csv", max_properties=100)
+    with pytest.raises(InvalidPortfolio) as raised:
+        for start in range(0, len(data), 4096):
+            builder.feed(data[start : start + 4096])
+
+    assert raised.value.errors == [
+        {"row": 2, "errors": [f"row longer than {MAX_ROW_BYTES} bytes"]}
+    ]
@@ -0,0 +1,98 @@
+import pytest
+
+from finance.simulate import property_metrics
+from finance.solver import solve_goal
+from schemas import GoalSeekRequest, SamplePortfolioResponse
+
+PROPERTIES = SamplePortfolioResponse.example().properties
+
+
+def solve(**options) -> list[dict]:
+    request = GoalSeekRequest(
+        **{"properties": PROPERTIES, "years": 10, "lower": 0, **options}
+    )
+    return solve_goal(request)["solutions"]
+
+
+def test_converged_values_reproduce_the_target():
+    solutions = solve(
+        metric="annual_cashflow",
+        solve_for="annual_rent",
+        targets=[0, 10_000],
+        upper=200_000,
+    )
+
+    assert [solution["status"] for solution in solutions] == ["converged"] * 4
+    for solution, prop in zip(solutions, [p for p in PROPERTIES for _ in range(2)]):
+        metrics = property_metrics(
+            prop.copy(update={"annual_rent": solution["value"]}), 0.03, 0.02, 10
+        )
+        assert metrics.annual_cashflow == pytest.approx(solution["target"], abs=0.01)
+
+
+def test_unreachable_targets_are_not_bracketed():
+    solutions = solve(
+        metric="annual_cashflow",
+        solve_for="annual_rent",
+        targets=[-1e9],
+        upper=200_000,
+    )
+
+    assert {solution["status"] for solution in solutions} == {"not_bracketed"}
+    assert {solution["value"] for solution in solutions} == {None}
+
+
+def test_too_few_iterations_are_not_converged():
+    solutions = solve(
+        metric="equity",
+        solve_for="mortgage_rate",
+        targets=[200_000],
+        upper=0.5,
+        max_iterations=1,
+        tolerance=1e-6,
+    )
+
+    assert {solution["status"] for solution in solutions} == {"not_converged"}
+    assert all(solution["iterations"] == 1 for solution in solutions)
+
+
+def test_down_payment_never_exceeds_the_purchase_price():
+    # Cashflow keeps rising with a down payment past the price; the cap stops it.
+    solutions = solve(
+        metric="annual_cashflow",
+        solve_for="down_payment",
+        targets=[100_000],
+        upper=100_000_000,
+    )
+    for solution in solutions:
+        assert solution["status"] == "not_bracketed"
+
+    reachable = solve(
+        metric="annual_cashflow",
+        solve_for="down_payment",
+        targets=[20_000],
+        upper=10_000_000,
+    )
+    for solution, prop in zip(reachable, PROPERTIES):
+        assert solution["status"] == "converged"
+        assert solution["value"] <= prop.purchase_price
+
+
+def test_empty_portfolio_solves_the_zero_total():
+    solutions = solve_goal(
+        GoalSeekRequest(
+            properties=[],
+            years=10,
+            metric="cashflow",
+            solve_for="down_payment",
+            targets=[0, 100],
+            lower=0,
+            upper=100_000,
+            scope="portfolio",
+        )
+    )["solutions"]
+
+    assert [solution["status"] for solution in solutions] == [
+        "converged",
+        "not_bracketed",
+    ]
@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+
+from finance.statistics import (
+    FINE_BINS,
+    MIN_PRECISION_BATCHES,
+    PERCENTILES,
+    BatchMeans,
+    StreamingSummary,
+    t_score,
+    z_score,
+)
+
+
+def summary_of(*chunks: np.ndarray) -> StreamingSummary:
+    summary = StreamingSummary()
+    for chunk in chunks:
+        summary.update(chunk)
+    return summary
+
+
+def test_small_streams_match_numpy_exactly():
+    values = np.random.default_rng(0).normal(1e6, 2_000, 1000)
+    summary = summary_of(*np.array_split(values, 4))
+
+    for percentile in PERCENTILES:
+        assert summary.quantile(percentile / 100) == np.quantile(
+            values, percentile / 100
+        )
+    counts, edges = np.histogram(values, bins=20)
+    assert summary.histogram(20) == {
+        "edges": edges.tolist(),
+        "counts": counts.tolist(),
+    }
+
+
+def test_large_streams_do_not_depend_on_chunking_or_merge_order():
+    values = np.random.default_rng(1).lognormal(10, 1, 20_000)
+    whole = summary_of(values)
+    chunked = summary_of(*np.array_split(values, 7))
+    merged = StreamingSummary()
+    for part in reversed(np.array_split(values, 3)):
+        merged.merge(summary_of(part))
+
+    for summary in (chunked, merged):
+        assert summary.histogram() == whole.histogram()
+        assert summary.to_dict() == pytest.approx(whole.to_dict(), rel=1e-12)
+    histogram = whole.histogram()
+    assert sum(histogram["counts"]) == values.size
+    assert histogram["edges"][0] <= values.min()
+    assert histogram["edges"][-1] > values.max()
+    for percentile in PERCENTILES:
+        exact = np.quantile(values, percentile / 100)
+        assert whole.quantile(percentile / 100) == pytest.approx(exact, rel=0.01)
+
+
+def test_histogram_widens_before_counting_a_far_value():
+    summary = StreamingSummary()
+    summary.update(np.zeros(1100))
+    summary.update(np.array([3000.0]))
+
+    assert summary._bins.counts.size <= FINE_BINS
+    assert summary.quantile(0.5) == 0.0
+    assert summary.maximum == 3000.0
+    assert sum(summary.histogram(10)["counts"]) == 1101
+
+
+def test_merging_narrow_and_far_summaries_stays_bounded():
+    narrow, far = StreamingSummary(), StreamingSummary()
+    narrow.update(np.zeros(1100))
+    far.update(np.full(1100, 5e6))
+    narrow.merge(far)
+
+    assert narrow._bins.counts.size <= FINE_BINS
+    assert narrow.count == 2200
+    assert narrow.quantile(0.25) == 0.0
+    assert abs(narrow.quantile(0.75) - 5e6) <= 0.01 * 5e6
+
+
+@pytest.mark.parametrize(
+    "confidence_level, degrees_of_freedom, expected",
+    [
+        (0.95, 1, 12.706),
+        (0.95, 10, 2.228),
+        (0.95, 29, 2.045),
+        (0.99, 5, 4.032),
+        (0.95, 99, 1.984),
+        (0.95, 100, 1.984),
+        (0.95, 1000, 1.962),
+    ],
+)
+def test_t_score_matches_tables(confidence_level, degrees_of_freedom, expected):
+    assert t_score(confidence_level, degrees_of_freedom) == pytest.approx(
+        expected, abs=1e-3
+    )
+
+
+def test_batch_standard_error_uses_the_spread_of_batch_means():
+    values = np.random.default_rng(2).normal(0, 1, 400)
+    ids = np.repeat(np.arange(100), 4)
+    whole = BatchMeans()
+    whole.update(values, ids)
+    whole.flush()
+    # Splitting inside a batch and merging at a batch boundary change nothing.
+    split, tail = BatchMeans(), BatchMeans()
+    split.update(values[:7], ids[:7])
+    split.update(values[7:200], ids[7:200])
+    tail.update(values[200:], ids[200:])
+    split.merge(tail)
+
+    expected = values.reshape(100, 4).mean(axis=1).std(ddof=1) / 10
+    assert whole.batches == split.batches == 100
+    assert whole.std_error == pytest.approx(expected, rel=1e-12)
+    assert split.std_error == pytest.approx(expected, rel=1e-12)
+
+
+def test_mean_interval_needs_enough_batches_before_stopping_a_run():
+    values = np.random.default_rng(3).normal(100, 10, 2 * MIN_PRECISION_BATCHES)
+    pairs = StreamingSummary()
+    pairs.update(values[:-2], np.repeat(np.arange(MIN_PRECISION_BATCHES - 1), 2))
+    pairs.batch_means.flush()
+    assert pairs.mean_half_width(0.95) == float("inf")
+
+    summary = summary_of(values)
+    error = values.std(ddof=1) / np.sqrt(values.size)
+    interval = summary.intervals(0.95)["mean"]
+    assert interval["std_error"] == pytest.approx(error, rel=1e-9)
+    assert interval["high"] - summary.mean == pytest.approx(
+        t_score(0.95, values.size - 1) * error, rel=1e-9
+    )
+
+
+def test_percentile_intervals_cover_the_exact_value_for_independent_draws():
+    values = np.random.default_rng(4).lognormal(10, 1, 20_000)
+    summary = summary_of(values)
+    intervals = summary.intervals(0.95)
+
+    for percentile in PERCENTILES:
+        interval = intervals[f"p{percentile}"]
+        exact = np.quantile(values, percentile / 100)
+        assert interval["low"] <= exact <= interval["high"]
+        half_width = (interval["high"] - interval["low"]) / 2
+        assert interval["std_error"] >= half_width / z_score(0.95) - 1e-9
+    assert set(summary.intervals(0.95, independent=False)) == {"mean", "std"}
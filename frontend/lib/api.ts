@@ -40,3 +40,35 @@ export async function runMonteCarlo(payload: SimulationRequest & { iterations: n
   if (!response.ok) throw new Error("Monte Carlo request failed");
   return response.json();
 }
+
+export interface MonteCarloStreamMessage {
+  event: "runs" | "summary";
+  completed: number;
+  summary: Record<string, Record<string, number>>;
+  runs?: Array<{ appreciation_rate: number; rent_growth_rate: number; totals: Record<string, number> }>;
+  histograms?: Record<string, { edges: number[]; counts: number[] }>;
+}
+
+export async function streamMonteCarlo(
+  payload: SimulationRequest & { iterations: number; appreciation_volatility: number; rent_growth_volatility: number; summary_only?: boolean; },
+  onMessage: (message: MonteCarloStreamMessage) => void,
+) {
+  const response = await fetch(`${API_BASE}/monte-carlo/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok || !response.body) throw new Error("Monte Carlo request failed");
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const lines = buffer.split("\n");
+    buffer = lines.pop() ?? "";
+    lines.filter((line) => line.trim()).forEach((line) => onMessage(JSON.parse(line)));
+    if (done) break;
+  }
+}
@@ -4,8 +4,8 @@ import { create } from "zustand";
 
 import {
   fetchSamplePortfolio as fetchSamplePortfolioApi,
-  runMonteCarlo as runMonteCarloApi,
   simulatePortfolio as simulatePortfolioApi,
+  streamMonteCarlo as streamMonteCarloApi,
 } from "../lib/api";
 
 export interface Property {
@@ -24,7 +24,7 @@ type NewPropertyInput = Omit<Property, "id">;
 interface PortfolioState {
   properties: Property[];
   totals: { cashflow: number; equity: number; investment: number };
-  monteCarloSummary: Record<string, { min: number; mean: number; max: number }>;
+  monteCarloSummary: Record<string, Record<string, number>>;
   addProperty: (property: NewPropertyInput) => void;
   clearProperties: () => void;
   fetchSamplePortfolio: () => Promise<void>;
@@ -133,7 +133,8 @@ export const usePortfolioStore = create<PortfolioState>((set, get) => ({
         annual_expenses: property.annualExpenses,
       })),
     };
-    const data = await runMonteCarloApi(payload);
-    set({ monteCarloSummary: data.summary });
+    await streamMonteCarloApi({ ...payload, summary_only: true }, (message) =>
+      set({ monteCarloSummary: message.summary }),
+    );
   },
 }));